@@ -1,9 +1,28 @@
+import csv
+import hashlib
+import json
+import multiprocessing
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+import socket
+import time
+import zlib
+from contextlib import contextmanager
+import click
+from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response, abort
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from markupsafe import Markup
+from werkzeug.http import is_resource_modified
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import generate_password_hash
 from apscheduler.schedulers.background import BackgroundScheduler
+from cache import CacheLRU, CacheSQLite, CacheEmCamadas
+from senhas import Hasheador, LimitadorTentativas, SobrecargaHash
+from metricas import Metricas
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key')
@@ -14,14 +33,61 @@ if uri and uri.startswith('postgres://'):
     uri = uri.replace('postgres://', 'postgresql://', 1)
 app.config['SQLALCHEMY_DATABASE_URI'] = uri
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['ITENS_POR_PAGINA'] = int(os.getenv('ITENS_POR_PAGINA', 50))
+app.config['RESET_INTERVALO_MINUTOS'] = int(os.getenv('RESET_INTERVALO_MINUTOS', 5))
+app.config['RESET_LOTE'] = int(os.getenv('RESET_LOTE', 1000))
+app.config['CACHE_TTL'] = int(os.getenv('CACHE_TTL', 300))
+app.config['CACHE_TAMANHO'] = int(os.getenv('CACHE_TAMANHO', 512))
+# Arquivo SQLite opcional para compartilhar os fragmentos entre os workers
+app.config['CACHE_ARQUIVO'] = os.getenv('CACHE_ARQUIVO')
+# Método do werkzeug, ex.: 'pbkdf2:sha256:600000' ou 'scrypt:32768:8:1'.
+# Hashes antigos são refeitos no próximo login quando o método muda.
+app.config['SENHA_METODO'] = os.getenv('SENHA_METODO', 'pbkdf2')
+# Processos dedicados ao hash (0 = na própria thread da requisição). O valor vale
+# por worker do gunicorn: W workers com N processos somam W*N processos de hash.
+app.config['SENHA_PROCESSOS'] = int(os.getenv('SENHA_PROCESSOS', 1))
+app.config['SENHA_FILA_MAXIMA'] = int(os.getenv('SENHA_FILA_MAXIMA', 16))
+app.config['SENHA_TIMEOUT'] = float(os.getenv('SENHA_TIMEOUT', 10))
+app.config['LOGIN_TENTATIVAS_USUARIO'] = int(os.getenv('LOGIN_TENTATIVAS_USUARIO', 5))
+# O limite por IP só pega força bruta distribuída entre usuários: fica bem acima
+# do limite por usuário, já que vários jogadores podem sair pelo mesmo NAT
+app.config['LOGIN_TENTATIVAS_IP'] = int(os.getenv('LOGIN_TENTATIVAS_IP', 100))
+app.config['LOGIN_JANELA_SEGUNDOS'] = int(os.getenv('LOGIN_JANELA_SEGUNDOS', 300))
+# Métricas em /metrics (só para o mestre); desligadas não custam nada
+app.config['METRICAS'] = os.getenv('METRICAS', '') in ('1', 'true', 'sim')
+# Fração das requisições perfiladas com cProfile; as que passarem do limiar
+# são gravadas em PERFIL_PASTA
+app.config['PERFIL_AMOSTRAGEM'] = float(os.getenv('PERFIL_AMOSTRAGEM', 0))
+app.config['PERFIL_LIMIAR_MS'] = int(os.getenv('PERFIL_LIMIAR_MS', 500))
+app.config['PERFIL_PASTA'] = os.getenv('PERFIL_PASTA', 'perfis')
+# Proxies reversos confiáveis na frente do app (nginx, balanceador...). Com 0,
+# remote_addr é o do próprio proxy e todos os logins dividiriam o mesmo IP.
+app.config['PROXY_SALTOS'] = int(os.getenv('PROXY_SALTOS', 0))
+if app.config['PROXY_SALTOS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_SALTOS'],
+                            x_proto=app.config['PROXY_SALTOS'])
 
 db = SQLAlchemy(app)
+metricas = Metricas()
+metricas.init_app(app)
+
+cache_fragmentos = CacheLRU(app.config['CACHE_TAMANHO'], app.config['CACHE_TTL'])
+if app.config['CACHE_ARQUIVO']:
+    cache_fragmentos = CacheEmCamadas(cache_fragmentos,
+                                      CacheSQLite(app.config['CACHE_ARQUIVO'], app.config['CACHE_TTL']))
+
+hasheador = Hasheador(app.config['SENHA_METODO'], app.config['SENHA_PROCESSOS'],
+                      app.config['SENHA_FILA_MAXIMA'], app.config['SENHA_TIMEOUT'])
+tentativas_usuario = LimitadorTentativas(app.config['LOGIN_TENTATIVAS_USUARIO'],
+                                         app.config['LOGIN_JANELA_SEGUNDOS'])
+tentativas_ip = LimitadorTentativas(app.config['LOGIN_TENTATIVAS_IP'],
+                                    app.config['LOGIN_JANELA_SEGUNDOS'])
 
 # Modelos
 class Usuario(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(256))
     is_master = db.Column(db.Boolean, default=False)
     cavaleiro = db.relationship('Cavaleiro', backref='usuario', uselist=False)
 
@@ -31,9 +97,14 @@ class Cavaleiro(db.Model):
     classe = db.Column(db.String(20), default='Guerreiro')
     nivel = db.Column(db.Integer, default=1)
     experiencia = db.Column(db.Integer, default=0)
-    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'))
-    quests = db.relationship('Quest', backref='cavaleiro', lazy=True)
-    conquistas = db.relationship('Conquista', backref='cavaleiro', lazy=True)
+    # Soma de todo o XP já ganho; nivel e experiencia são derivados dela
+    experiencia_total = db.Column(db.Integer, default=0)
+    # Indexado: /ranking e Usuario.cavaleiro buscam o cavaleiro pelo usuário
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), index=True)
+    # Coleções grandes: as rotas paginam Quest/Conquista diretamente, e 'raise'
+    # impede que um template percorra a coleção inteira (N+1) sem querer
+    quests = db.relationship('Quest', backref='cavaleiro', lazy='raise')
+    conquistas = db.relationship('Conquista', backref='cavaleiro', lazy='raise')
 
 class Quest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -48,6 +119,27 @@ class Quest(db.Model):
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     cavaleiro_id = db.Column(db.Integer, db.ForeignKey('cavaleiro.id'))
     experiencia_recompensa = db.Column(db.Integer, default=10)
+    # Quando a quest concluída volta a ficar pendente (None = não reseta)
+    proximo_reset = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_quest_cavaleiro_concluida_data', 'cavaleiro_id', 'concluida', 'data_criacao'),
+        # Paginação do perfil (cavaleiro_id = ? AND id > cursor ORDER BY id)
+        db.Index('ix_quest_cavaleiro_id', 'cavaleiro_id', 'id'),
+        db.Index('ix_quest_global', 'global_quest'),
+        db.Index('ix_quest_proximo_reset', 'proximo_reset',
+                 postgresql_where=db.text('proximo_reset IS NOT NULL'),
+                 sqlite_where=db.text('proximo_reset IS NOT NULL')),
+    )
+
+    def calcular_proximo_reset(self, agora):
+        """Diárias resetam à meia-noite (UTC) seguinte, semanais no domingo seguinte."""
+        meia_noite = datetime(agora.year, agora.month, agora.day)
+        if self.diaria:
+            return meia_noite + timedelta(days=1)
+        if self.semanal:
+            return meia_noite + timedelta(days=(6 - agora.weekday()) % 7 or 7)
+        return None
 
 class Conquista(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -57,13 +149,226 @@ class Conquista(db.Model):
     cavaleiro_id = db.Column(db.Integer, db.ForeignKey('cavaleiro.id'))
     global_conquista = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        db.Index('ix_conquista_cavaleiro_data', 'cavaleiro_id', 'data'),
+        db.Index('ix_conquista_cavaleiro_id', 'cavaleiro_id', 'id'),
+        db.Index('ix_conquista_global', 'global_conquista'),
+    )
+
+class RegistroExperiencia(db.Model):
+    """Livro-razão de XP, só recebe inserções (desmarcar uma quest gera um
+    lançamento negativo)."""
+    id = db.Column(db.Integer, primary_key=True)
+    cavaleiro_id = db.Column(db.Integer, db.ForeignKey('cavaleiro.id'), index=True)
+    quest_id = db.Column(db.Integer, db.ForeignKey('quest.id'))
+    quantidade = db.Column(db.Integer, nullable=False)
+    # +1 ao concluir e -1 ao desmarcar a quest (o XP pode ser 0, então o sinal
+    # de quantidade não serve para distinguir)
+    quests = db.Column(db.Integer, default=0, nullable=False)
+    data = db.Column(db.DateTime, default=datetime.utcnow)
+
+GRUPOS_CACHE = ('cavaleiros', 'quests_globais', 'conquistas_globais')
+
+class VersaoCache(db.Model):
+    """Versão de cada grupo de dados cacheado. As escritas incrementam a versão
+    na mesma transação, o que invalida os fragmentos em todos os workers e
+    alimenta o ETag/Last-Modified das páginas."""
+    grupo = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, default=0, nullable=False)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class TravaAgendador(db.Model):
+    """Trava com prazo para eleger um único executor dos jobs agendados
+    quando o banco não tem advisory locks (SQLite)."""
+    nome = db.Column(db.String(50), primary_key=True)
+    dono = db.Column(db.String(100))
+    expira_em = db.Column(db.DateTime)
+
+class EstatisticaCavaleiro(db.Model):
+    """Resumo por cavaleiro para o /ranking, mantido incrementalmente pelas
+    rotas que alteram XP e conquistas (ver atualizar_ranking).
+
+    posicao = 1 + número de cavaleiros com mais XP (empates dividem a posição).
+    Cavaleiros sem XP ficam com posicao NULL: estão todos empatados em último e
+    a posição deles é derivada na leitura, para que o primeiro XP de um deles
+    não reescreva a linha de todos os outros.
+    quests_dia/quests_semana só valem para o dia/semana gravados em dia/semana."""
+    cavaleiro_id = db.Column(db.Integer, db.ForeignKey('cavaleiro.id'), primary_key=True)
+    experiencia_total = db.Column(db.Integer, default=0, nullable=False, index=True)
+    posicao = db.Column(db.Integer, index=True)
+    quests_dia = db.Column(db.Integer, default=0, nullable=False)
+    dia = db.Column(db.Date, index=True)
+    quests_semana = db.Column(db.Integer, default=0, nullable=False)
+    semana = db.Column(db.Date, index=True)
+    conquistas = db.Column(db.Integer, default=0, nullable=False)
+
+def inicio_da_semana(dia):
+    """Semanas começam no domingo, como o reset das quests semanais."""
+    return dia - timedelta(days=(dia.weekday() + 1) % 7)
+
+def travar_ranking():
+    """Serializa a manutenção das posições no Postgres até o fim da transação
+    (no SQLite a escrita já bloqueia o banco inteiro). Deve ser tomada antes de
+    bloquear linhas de Cavaleiro ou EstatisticaCavaleiro; pode ser repetida."""
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:k)'), {'k': zlib.crc32(b'ranking')})
+
+def estatistica_para_atualizar(cavaleiro_id):
+    """Retorna (experiencia_total, posicao) do resumo, criando-o se necessário."""
+    E = EstatisticaCavaleiro
+    linha = db.session.query(E.experiencia_total, E.posicao).filter_by(cavaleiro_id=cavaleiro_id).first()
+    if linha:
+        return linha
+    # Um cavaleiro novo (0 XP) não passa ninguém, então as outras posições não mudam
+    db.session.execute(E.__table__.insert(), {
+        'cavaleiro_id': cavaleiro_id, 'experiencia_total': 0, 'posicao': None,
+        'quests_dia': 0, 'quests_semana': 0, 'conquistas': 0})
+    return 0, None
+
+def posicao_sem_experiencia():
+    """Posição compartilhada pelos cavaleiros sem XP (posicao NULL no resumo):
+    a do último colocado com XP mais o tamanho do empate dele. Usa os índices
+    de posicao e experiencia_total em vez de contar todos os que têm XP."""
+    E = EstatisticaCavaleiro
+    ultimo = (db.session.query(E.posicao, E.experiencia_total).filter(E.posicao != None)
+              .order_by(E.posicao.desc()).first())
+    if ultimo is None:
+        return 1
+    empatados = db.session.query(db.func.count(E.cavaleiro_id)).filter(
+        E.experiencia_total == ultimo.experiencia_total).scalar()
+    return ultimo.posicao + empatados
+
+def atualizar_ranking(cavaleiro_id, experiencia_total, quests=0, conquistas=0):
+    """Leva o resumo do cavaleiro ao novo XP total, somando `quests` concluídas
+    (negativo ao desmarcar) e `conquistas`. Só os cavaleiros ultrapassados (ou
+    que o ultrapassam) têm a posição alterada. Com experiencia_total=None, só
+    os contadores mudam. Sem commit."""
+    E = EstatisticaCavaleiro
+    travar_ranking()
+    de, posicao = estatistica_para_atualizar(cavaleiro_id)
+    para = de if experiencia_total is None else experiencia_total
+    # Só quem tem XP guarda posição; os empatados em 0 nunca são reescritos
+    outros = E.query.filter(E.cavaleiro_id != cavaleiro_id, E.experiencia_total > 0)
+    contar = db.session.query(db.func.count(E.cavaleiro_id)).filter(E.cavaleiro_id != cavaleiro_id)
+    if para > de:
+        if posicao is None:
+            posicao = 1 + contar.filter(E.experiencia_total > para).scalar()
+        else:
+            posicao -= contar.filter(E.experiencia_total > de, E.experiencia_total <= para).scalar()
+        outros.filter(E.experiencia_total >= de, E.experiencia_total < para).update(
+            {'posicao': E.posicao + 1}, synchronize_session=False)
+    elif para < de:
+        if para > 0:
+            posicao += contar.filter(E.experiencia_total > para, E.experiencia_total <= de).scalar()
+        else:
+            posicao = None
+        outros.filter(E.experiencia_total >= para, E.experiencia_total < de).update(
+            {'posicao': E.posicao - 1}, synchronize_session=False)
+
+    hoje = datetime.utcnow().date()
+    semana = inicio_da_semana(hoje)
+    def somar(contador, referencia, atual):
+        # Desmarcar uma quest de um período anterior não deixa o contador negativo
+        novo = db.case((referencia == atual, contador + quests), else_=quests)
+        return db.case((novo < 0, 0), else_=novo)
+    db.session.query(E).filter_by(cavaleiro_id=cavaleiro_id).update({
+        'experiencia_total': para,
+        'posicao': posicao,
+        'quests_dia': somar(E.quests_dia, E.dia, hoje),
+        'dia': hoje,
+        'quests_semana': somar(E.quests_semana, E.semana, semana),
+        'semana': semana,
+        'conquistas': E.conquistas + conquistas,
+    }, synchronize_session=False)
+
+def zerar_contadores_vencidos():
+    """Zera quests_dia/quests_semana de dias e semanas que já passaram."""
+    E = EstatisticaCavaleiro
+    travar_ranking()
+    hoje = datetime.utcnow().date()
+    E.query.filter(E.dia < hoje, E.quests_dia != 0).update({'quests_dia': 0}, synchronize_session=False)
+    E.query.filter(E.semana < inicio_da_semana(hoje), E.quests_semana != 0).update(
+        {'quests_semana': 0}, synchronize_session=False)
+
+def reconstruir_ranking(lote=5000):
+    """Recalcula todo o resumo a partir de Cavaleiro, Conquista e do livro-razão
+    de XP. Para recuperação; o caminho normal é atualizar_ranking."""
+    E = EstatisticaCavaleiro
+    hoje = datetime.utcnow().date()
+    semana = inicio_da_semana(hoje)
+    def quests_desde(inicio):
+        # Conclusões (+1) menos desmarcações (-1) do livro-razão; como no caminho
+        # incremental, o contador nunca fica negativo
+        return {cavaleiro_id: max(0, total) for cavaleiro_id, total in
+                db.session.query(RegistroExperiencia.cavaleiro_id,
+                                 db.func.sum(RegistroExperiencia.quests))
+                .filter(RegistroExperiencia.quest_id != None,
+                        RegistroExperiencia.data >= datetime(inicio.year, inicio.month, inicio.day))
+                .group_by(RegistroExperiencia.cavaleiro_id)}
+    quests_hoje = quests_desde(hoje)
+    quests_semana = quests_desde(semana)
+    conquistas = dict(db.session.query(Conquista.cavaleiro_id, db.func.count(Conquista.id))
+                      .filter(Conquista.cavaleiro_id != None)
+                      .group_by(Conquista.cavaleiro_id))
+
+    travar_ranking()
+    E.query.delete()
+    consulta = db.session.query(
+        Cavaleiro.id, Cavaleiro.experiencia_total,
+        db.func.rank().over(order_by=Cavaleiro.experiencia_total.desc()))
+    linhas = []
+    for cavaleiro_id, experiencia_total, posicao in consulta.yield_per(lote):
+        linhas.append({
+            'cavaleiro_id': cavaleiro_id, 'experiencia_total': experiencia_total or 0,
+            'posicao': posicao if experiencia_total else None,
+            'quests_dia': quests_hoje.get(cavaleiro_id, 0), 'dia': hoje,
+            'quests_semana': quests_semana.get(cavaleiro_id, 0), 'semana': semana,
+            'conquistas': conquistas.get(cavaleiro_id, 0)})
+        if len(linhas) >= lote:
+            db.session.execute(E.__table__.insert(), linhas)
+            linhas = []
+    if linhas:
+        db.session.execute(E.__table__.insert(), linhas)
+    db.session.commit()
+
+@app.cli.command('reconstruir-ranking')
+def reconstruir_ranking_comando():
+    """Recalcula a tabela de ranking do zero."""
+    reconstruir_ranking()
+    print('Ranking reconstruído com sucesso!')
+
+def adicionar_colunas_faltantes(modelo):
+    """create_all não altera tabelas existentes; adiciona as colunas novas.
+    Retorna os nomes das colunas adicionadas, para preencher só na migração."""
+    tabela = modelo.__table__
+    existentes = {c['name'] for c in inspect(db.engine).get_columns(tabela.name)}
+    adicionadas = set()
+    with db.engine.begin() as conn:
+        for coluna in tabela.columns:
+            if coluna.name not in existentes:
+                tipo = coluna.type.compile(dialect=db.engine.dialect)
+                conn.execute(text(f'ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo}'))
+                adicionadas.add(coluna.name)
+    return adicionadas
+
 # Inicialização do banco de dados
 with app.app_context():
     db.create_all()
+    # create_all não altera tabelas existentes; garante colunas e índices em bancos antigos
+    colunas_quest = adicionar_colunas_faltantes(Quest)
+    adicionar_colunas_faltantes(Cavaleiro)
+    # Hashes scrypt não cabem nos 128 caracteres originais
+    if db.engine.dialect.name == 'postgresql':
+        coluna = next(c for c in inspect(db.engine).get_columns('usuario') if c['name'] == 'password_hash')
+        if coluna['type'].length and coluna['type'].length < 256:
+            with db.engine.begin() as conn:
+                conn.execute(text('ALTER TABLE usuario ALTER COLUMN password_hash TYPE VARCHAR(256)'))
+    for indice in Quest.__table__.indexes | Conquista.__table__.indexes | Cavaleiro.__table__.indexes:
+        indice.create(db.engine, checkfirst=True)
     if not Usuario.query.filter_by(is_master=True).first():
         mestre = Usuario(
             username='mestre',
-            password_hash=generate_password_hash('mestre123'),
+            password_hash=generate_password_hash('mestre123', app.config['SENHA_METODO']),
             is_master=True
         )
         db.session.add(mestre)
@@ -74,27 +379,106 @@ with app.app_context():
         )
         db.session.add(cavaleiro_mestre)
         db.session.commit()
+    # XP total dos cavaleiros anteriores ao experiencia_total: níveis completos + XP atual
+    Cavaleiro.query.filter(Cavaleiro.experiencia_total == None).update(
+        {'experiencia_total': 50 * Cavaleiro.nivel * (Cavaleiro.nivel - 1) + Cavaleiro.experiencia},
+        synchronize_session=False)
+    for grupo in GRUPOS_CACHE:
+        if not db.session.get(VersaoCache, grupo):
+            db.session.add(VersaoCache(grupo=grupo))
+    if 'proximo_reset' in colunas_quest:
+        # Quests já concluídas seguem a mesma regra de calcular_proximo_reset:
+        # diárias na próxima meia-noite, semanais no próximo domingo
+        agora = datetime.utcnow()
+        Quest.query.filter(
+            Quest.concluida == True,
+            (Quest.diaria == True) | (Quest.semanal == True)
+        ).update({'proximo_reset': db.case(
+            (Quest.diaria == True, Quest(diaria=True).calcular_proximo_reset(agora)),
+            else_=Quest(semanal=True).calcular_proximo_reset(agora))}, synchronize_session=False)
+    db.session.commit()
+    if not EstatisticaCavaleiro.query.first() and Cavaleiro.query.first():
+        reconstruir_ranking()
 
 # Agendador para resetar quests
+@contextmanager
+def executor_unico(nome, duracao=timedelta(minutes=10)):
+    """Garante que só um processo (entre todos os workers) execute o bloco.
+
+    Produz True se este processo obteve a trava. No Postgres usa
+    pg_try_advisory_lock; nos demais bancos, a tabela TravaAgendador."""
+    if db.engine.dialect.name == 'postgresql':
+        chave = zlib.crc32(nome.encode())
+        with db.engine.connect() as conn:
+            obtida = conn.execute(text('SELECT pg_try_advisory_lock(:k)'), {'k': chave}).scalar()
+            conn.commit()
+            try:
+                yield obtida
+            finally:
+                if obtida:
+                    conn.execute(text('SELECT pg_advisory_unlock(:k)'), {'k': chave})
+                    conn.commit()
+        return
+
+    dono = f'{socket.gethostname()}:{os.getpid()}'
+    agora = datetime.utcnow()
+    try:
+        db.session.add(TravaAgendador(nome=nome, dono=dono, expira_em=agora + duracao))
+        db.session.commit()
+        obtida = True
+    except IntegrityError:
+        db.session.rollback()
+        obtida = TravaAgendador.query.filter(
+            TravaAgendador.nome == nome,
+            (TravaAgendador.expira_em < agora) | (TravaAgendador.dono == dono)
+        ).update({'dono': dono, 'expira_em': agora + duracao}, synchronize_session=False) == 1
+        db.session.commit()
+    try:
+        yield obtida
+    finally:
+        if obtida:
+            TravaAgendador.query.filter_by(nome=nome, dono=dono).delete()
+            db.session.commit()
+
+@metricas.medir_job('resetar_quests')
 def resetar_quests():
+    """Reseta apenas as quests com proximo_reset vencido, em lotes de RESET_LOTE.
+
+    O custo acompanha o número de quests concluídas, não o tamanho da tabela."""
     with app.app_context():
-        agora = datetime.utcnow()
-        Quest.query.filter(
-            Quest.diaria == True,
-            Quest.concluida == True
-        ).update({'concluida': False})
-        
-        if agora.weekday() == 6:  # Domingo
-            Quest.query.filter(
-                Quest.semanal == True,
-                Quest.concluida == True
-            ).update({'concluida': False})
-        
-        db.session.commit()
+        with executor_unico('resetar_quests') as obtida:
+            if not obtida:
+                return 0
+            agora = datetime.utcnow()
+            lote = app.config['RESET_LOTE']
+            total = 0
+            while True:
+                ids = [id_ for (id_,) in db.session.query(Quest.id)
+                       .filter(Quest.proximo_reset <= agora)
+                       .limit(lote)]
+                if not ids:
+                    break
+                # Repete o filtro: uma quest desmarcada e concluída de novo entre o
+                # SELECT e o UPDATE já tem proximo_reset futuro e não pode resetar
+                resetadas = Quest.query.filter(Quest.id.in_(ids), Quest.proximo_reset <= agora).update(
+                    {'concluida': False, 'proximo_reset': None},
+                    synchronize_session=False)
+                if db.session.query(Quest.id).filter(Quest.id.in_(ids), Quest.global_quest == True).first():
+                    invalidar_cache('quests_globais')
+                db.session.commit()
+                total += resetadas
+                if len(ids) < lote:
+                    break
+            zerar_contadores_vencidos()
+            db.session.commit()
+            return total
 
 scheduler = BackgroundScheduler()
-scheduler.add_job(resetar_quests, 'interval', hours=1)
-scheduler.start()
+scheduler.add_job(resetar_quests, 'interval', minutes=app.config['RESET_INTERVALO_MINUTOS'])
+# Os processos do pool de hash reimportam o script principal (python app.py);
+# só o processo principal agenda
+if multiprocessing.parent_process() is None:
+    scheduler.start()
 
 # Rotas
 @app.route('/')
@@ -102,21 +486,56 @@ def tabuleiro():
     if 'user_id' not in session:
         return render_template('login.html')
     
-    cavaleiros = Cavaleiro.query.all()
-    quests_globais = Quest.query.filter_by(global_quest=True).all()
-    return render_template('tabuleiro.html',
-                         cavaleiros=cavaleiros,
-                         quests_globais=quests_globais,
-                         is_master=is_master())
+    # O tabuleiro só mostra alguns campos: projeta as colunas em vez de carregar os modelos
+    def carregar_cavaleiros():
+        cavaleiros, proximo = paginar(
+            db.session.query(Cavaleiro.id, Cavaleiro.nome, Cavaleiro.classe),
+            Cavaleiro.id, 'cavaleiros_depois')
+        return {'cavaleiros': cavaleiros, 'proximo_cavaleiros': proximo}
+
+    def carregar_quests_globais():
+        quests_globais, proximo = paginar(
+            db.session.query(Quest.id, Quest.titulo, Quest.concluida).filter_by(global_quest=True),
+            Quest.id, 'quests_depois')
+        return {'quests_globais': quests_globais, 'proximo_quests': proximo}
+
+    return pagina_condicional(('cavaleiros', 'quests_globais'), lambda versoes: render_template(
+        'tabuleiro.html',
+        fragmento_cavaleiros=fragmento('cavaleiros', versoes, 'fragmento_cavaleiros.html',
+                                       carregar_cavaleiros),
+        fragmento_quests_globais=fragmento('quests_globais', versoes, 'fragmento_quests_globais.html',
+                                           carregar_quests_globais),
+        is_master=is_master()))
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
-        user = Usuario.query.filter_by(username=request.form['username']).first()
-        if user and check_password_hash(user.password_hash, request.form['password']):
+        username = request.form['username']
+        chave_usuario = username.lower()
+        # Barra força bruta antes de gastar CPU com o hash
+        if tentativas_usuario.bloqueado(chave_usuario) or tentativas_ip.bloqueado(request.remote_addr):
+            flash('Muitas tentativas. Aguarde alguns minutos.', 'error')
+            return render_template('login.html'), 429
+        
+        user = Usuario.query.filter_by(username=username).first()
+        try:
+            valida = bool(user and user.password_hash and
+                          hasheador.verificar(user.password_hash, request.form['password']))
+        except SobrecargaHash:
+            return servidor_ocupado('login.html')
+        if valida:
+            tentativas_usuario.limpar(chave_usuario)
+            if hasheador.precisa_rehash(user.password_hash):
+                try:
+                    user.password_hash = hasheador.gerar(request.form['password'])
+                    db.session.commit()
+                except SobrecargaHash:
+                    pass  # fica para o próximo login
             session['user_id'] = user.id
             session['is_master'] = user.is_master
             return redirect(url_for('tabuleiro'))
+        tentativas_usuario.registrar_falha(chave_usuario)
+        tentativas_ip.registrar_falha(request.remote_addr)
         flash('Credenciais inválidas', 'error')
     return render_template('login.html')
 
@@ -127,12 +546,18 @@ def registrar():
             flash('Usuário já existe', 'error')
             return redirect(url_for('registrar'))
         
+        try:
+            password_hash = hasheador.gerar(request.form['password'])
+        except SobrecargaHash:
+            return servidor_ocupado('registrar.html')
+        
         novo_usuario = Usuario(
             username=request.form['username'],
-            password_hash=generate_password_hash(request.form['password']),
+            password_hash=password_hash,
             is_master=False
         )
         db.session.add(novo_usuario)
+        invalidar_cache('cavaleiros')
         db.session.commit()
         return redirect(url_for('login'))
     return render_template('registrar.html')
@@ -145,21 +570,69 @@ def logout():
 @app.route('/cavaleiro/<int:cavaleiro_id>')
 def perfil_cavaleiro(cavaleiro_id):
     cavaleiro = Cavaleiro.query.get_or_404(cavaleiro_id)
-    quests = Quest.query.filter_by(cavaleiro_id=cavaleiro_id).all()
-    conquistas = Conquista.query.filter_by(cavaleiro_id=cavaleiro_id).all()
+    quests, proximo_quests = paginar(Quest.query.filter_by(cavaleiro_id=cavaleiro_id),
+                                     Quest.id, 'quests_depois')
+    conquistas, proximo_conquistas = paginar(Conquista.query.filter_by(cavaleiro_id=cavaleiro_id),
+                                             Conquista.id, 'conquistas_depois')
     return render_template('perfil_cavaleiro.html',
                          cavaleiro=cavaleiro,
                          quests=quests,
                          conquistas=conquistas,
+                         proximo_quests=proximo_quests,
+                         proximo_conquistas=proximo_conquistas,
                          is_master=is_master())
 
 @app.route('/conquistas')
 def conquistas():
-    conquistas = Conquista.query.filter_by(global_conquista=True).all()
-    return render_template('conquistas.html',
-                         conquistas=conquistas,
+    def carregar_conquistas():
+        conquistas, proximo = paginar(
+            Conquista.query.filter_by(global_conquista=True)
+            .options(joinedload(Conquista.cavaleiro).load_only(Cavaleiro.nome)),
+            Conquista.id, 'conquistas_depois')
+        return {'conquistas': conquistas, 'proximo_conquistas': proximo}
+
+    return pagina_condicional(('conquistas_globais',), lambda versoes: render_template(
+        'conquistas.html',
+        fragmento_conquistas=fragmento('conquistas_globais', versoes, 'fragmento_conquistas_globais.html',
+                                       carregar_conquistas),
+        is_master=is_master()))
+
+@app.route('/ranking')
+def ranking():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    E = EstatisticaCavaleiro
+    colunas = (E.posicao, E.experiencia_total, E.quests_dia, E.dia, E.quests_semana, E.semana,
+               E.conquistas, Cavaleiro.id, Cavaleiro.nome, Cavaleiro.classe, Cavaleiro.nivel)
+    consulta = db.session.query(*colunas).join(Cavaleiro, Cavaleiro.id == E.cavaleiro_id)
+    limite = app.config['ITENS_POR_PAGINA']
+    primeiros = consulta.filter(E.posicao != None).order_by(E.posicao, E.cavaleiro_id).limit(limite).all()
+    if len(primeiros) < limite:
+        # Completa com os cavaleiros sem XP, empatados em último
+        primeiros += consulta.filter(E.posicao == None).order_by(E.cavaleiro_id).limit(
+            limite - len(primeiros)).all()
+    meu = consulta.filter(Cavaleiro.usuario_id == session['user_id']).first()
+    sem_experiencia = None
+    if any(linha.posicao is None for linha in primeiros + [meu] if linha):
+        sem_experiencia = posicao_sem_experiencia()
+    hoje = datetime.utcnow().date()
+    return render_template('ranking.html',
+                         primeiros=primeiros,
+                         meu=meu,
+                         sem_experiencia=sem_experiencia,
+                         hoje=hoje,
+                         semana=inicio_da_semana(hoje),
                          is_master=is_master())
 
+@app.route('/metrics')
+def metrics():
+    if not metricas.ativo:
+        abort(404)
+    if not is_master():
+        abort(403)
+    return metricas.exportar(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/adicionar_quest', methods=['POST'])
 def adicionar_quest():
     if 'user_id' not in session:
@@ -177,6 +650,8 @@ def adicionar_quest():
         experiencia_recompensa=int(request.form.get('experiencia_recompensa', 10))
     )
     db.session.add(nova_quest)
+    if nova_quest.global_quest:
+        invalidar_cache('quests_globais')
     db.session.commit()
     return redirect(url_for('perfil_cavaleiro', cavaleiro_id=request.form['cavaleiro_id']))
 
@@ -186,19 +661,42 @@ def toggle_quest(quest_id):
         return redirect(url_for('login'))
     
     quest = Quest.query.get_or_404(quest_id)
-    quest.concluida = not quest.concluida
-    
-    if quest.concluida and quest.cavaleiro_id:
-        cavaleiro = Cavaleiro.query.get(quest.cavaleiro_id)
-        cavaleiro.experiencia += quest.experiencia_recompensa
-        if cavaleiro.experiencia >= cavaleiro.nivel * 100:
-            cavaleiro.nivel += 1
-            cavaleiro.experiencia = 0
-            flash(f'{cavaleiro.nome} subiu para o nível {cavaleiro.nivel}!', 'success')
+    concluir = not quest.concluida
+    if marcar_quest(quest, concluir) and quest.cavaleiro_id:
+        quantidade = quest.experiencia_recompensa if concluir else -quest.experiencia_recompensa
+        subiram = aplicar_experiencia({quest.cavaleiro_id: quantidade},
+                                      [(quest.cavaleiro_id, quest.id, quantidade, 1 if concluir else -1)])
+        flash_subidas(subiram)
+    if quest.global_quest:
+        invalidar_cache('quests_globais')
     
     db.session.commit()
     return redirect(request.referrer)
 
+@app.route('/concluir_quests', methods=['POST'])
+def concluir_quests():
+    """Conclui várias quests (campo `quest_id` repetido) numa única transação."""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    ids = request.form.getlist('quest_id', type=int)
+    ganhos = {}
+    lancamentos = []
+    globais = False
+    for quest in Quest.query.filter(Quest.id.in_(ids), Quest.concluida == False).order_by(Quest.id):
+        if not marcar_quest(quest, True):
+            continue
+        globais = globais or quest.global_quest
+        if quest.cavaleiro_id:
+            ganhos[quest.cavaleiro_id] = ganhos.get(quest.cavaleiro_id, 0) + quest.experiencia_recompensa
+            lancamentos.append((quest.cavaleiro_id, quest.id, quest.experiencia_recompensa, 1))
+    flash_subidas(aplicar_experiencia(ganhos, lancamentos))
+    if globais:
+        invalidar_cache('quests_globais')
+    
+    db.session.commit()
+    return redirect(request.referrer or url_for('tabuleiro'))
+
 @app.route('/adicionar_conquista', methods=['POST'])
 def adicionar_conquista():
     if 'user_id' not in session or not is_master():
@@ -211,6 +709,11 @@ def adicionar_conquista():
         global_conquista='global_conquista' in request.form
     )
     db.session.add(nova_conquista)
+    if nova_conquista.cavaleiro_id:
+        # Só o contador de conquistas: XP e posição ficam com quem altera o XP
+        atualizar_ranking(nova_conquista.cavaleiro_id, None, conquistas=1)
+    if nova_conquista.global_conquista:
+        invalidar_cache('conquistas_globais')
     db.session.commit()
     return redirect(url_for('perfil_cavaleiro', cavaleiro_id=request.form['cavaleiro_id']))
 
@@ -218,5 +721,325 @@ def adicionar_conquista():
 def is_master():
     return 'is_master' in session and session['is_master']
 
+def servidor_ocupado(template):
+    """Resposta 503 rápida quando a fila de hashes de senha está cheia."""
+    flash('Servidor ocupado, tente novamente em instantes.', 'error')
+    return render_template(template), 503, {'Retry-After': '2'}
+
+def nivel_para_experiencia(total):
+    """Converte o XP total em (nivel, experiencia no nível); o nível N exige N * 100."""
+    nivel = 1
+    while total >= nivel * 100:
+        total -= nivel * 100
+        nivel += 1
+    return nivel, total
+
+def marcar_quest(quest, concluida):
+    """Marca/desmarca a quest só se ninguém mudou o estado antes (UPDATE
+    condicional). Retorna False se outra requisição chegou primeiro."""
+    proximo_reset = quest.calcular_proximo_reset(datetime.utcnow()) if concluida else None
+    alteradas = Quest.query.filter_by(id=quest.id, concluida=not concluida).update(
+        {'concluida': concluida, 'proximo_reset': proximo_reset}, synchronize_session=False)
+    return alteradas == 1
+
+def aplicar_experiencia(ganhos, lancamentos):
+    """Aplica {cavaleiro_id: xp} e grava os lançamentos (cavaleiro_id, quest_id,
+    xp, quests) no RegistroExperiencia, sem commit. quests é +1 para uma
+    conclusão e -1 para uma desmarcação; o xp gravado é o que foi de fato
+    aplicado, então a soma do livro-razão acompanha experiencia_total.
+
+    O UPDATE relativo em experiencia_total bloqueia a linha do cavaleiro até o
+    fim da transação (no SQLite, o banco todo), então o recálculo de nível
+    abaixo não perde atualizações concorrentes. Retorna [(nome, nivel)] de
+    quem subiu de nível."""
+    if not ganhos and not lancamentos:
+        return []
+    # A trava do ranking vem antes de qualquer linha de cavaleiro, em todos os
+    # caminhos; senão um lote e um toggle podem se esperar mutuamente no Postgres
+    travar_ranking()
+    quests = {}
+    for cavaleiro_id, _, _, n in lancamentos:
+        quests[cavaleiro_id] = quests.get(cavaleiro_id, 0) + n
+    lancamentos = [list(lancamento) for lancamento in lancamentos]
+    subiram = []
+    # Ordem fixa entre as linhas de cavaleiro do lote
+    for cavaleiro_id, quantidade in sorted(ganhos.items()):
+        Cavaleiro.query.filter_by(id=cavaleiro_id).update(
+            {'experiencia_total': Cavaleiro.experiencia_total + quantidade}, synchronize_session=False)
+        nome, nivel_anterior, total = db.session.query(
+            Cavaleiro.nome, Cavaleiro.nivel, Cavaleiro.experiencia_total
+        ).filter_by(id=cavaleiro_id).one()
+        if total < 0:
+            # O XP não fica negativo (cavaleiros migrados perderam o excedente da
+            # regra antiga de nível); o livro-razão recebe só o que foi aplicado
+            excesso, total = -total, 0
+            for lancamento in lancamentos:
+                if lancamento[0] == cavaleiro_id and lancamento[2] < 0 and excesso:
+                    ajuste = min(excesso, -lancamento[2])
+                    lancamento[2] += ajuste
+                    excesso -= ajuste
+        nivel, experiencia = nivel_para_experiencia(total)
+        Cavaleiro.query.filter_by(id=cavaleiro_id).update(
+            {'experiencia_total': total, 'nivel': nivel, 'experiencia': experiencia},
+            synchronize_session=False)
+        atualizar_ranking(cavaleiro_id, total, quests=quests.get(cavaleiro_id, 0))
+        if nivel > nivel_anterior:
+            subiram.append((nome, nivel))
+    if lancamentos:
+        db.session.execute(RegistroExperiencia.__table__.insert(), [
+            {'cavaleiro_id': c, 'quest_id': q, 'quantidade': x, 'quests': n, 'data': datetime.utcnow()}
+            for c, q, x, n in lancamentos])
+    return subiram
+
+def flash_subidas(subiram):
+    for nome, nivel in subiram:
+        flash(f'{nome} subiu para o nível {nivel}!', 'success')
+
+def invalidar_cache(*grupos):
+    """Incrementa a versão dos grupos; chamar antes do commit da escrita."""
+    VersaoCache.query.filter(VersaoCache.grupo.in_(grupos)).update(
+        {'versao': VersaoCache.versao + 1, 'atualizado_em': datetime.utcnow()},
+        synchronize_session=False)
+
+def fragmento(grupo, versoes, template, carregar):
+    """Renderiza `template` com o contexto de `carregar()`, ou devolve a versão em
+    cache. A chave inclui a versão do grupo e os parâmetros (cursores) da página."""
+    chave = f'{grupo}:{versoes[grupo][0]}:{sorted(request.args.items(multi=True))}'
+    html = cache_fragmentos.get(chave)
+    if html is None:
+        html = render_template(template, **carregar())
+        cache_fragmentos.set(chave, html)
+    return Markup(html)
+
+def pagina_condicional(grupos, gerar):
+    """Responde 304 se o navegador já tem a página (ETag/Last-Modified derivados
+    das versões dos grupos); senão chama gerar(versoes)."""
+    versoes = {v.grupo: (v.versao, v.atualizado_em)
+               for v in VersaoCache.query.filter(VersaoCache.grupo.in_(grupos))}
+    etag = hashlib.sha1(repr((
+        sorted((grupo, versao) for grupo, (versao, _) in versoes.items()),
+        sorted(request.args.items(multi=True)),
+        'user_id' in session,
+        is_master(),
+    )).encode()).hexdigest()
+    ultima_alteracao = max(atualizado_em for _, atualizado_em in versoes.values())
+    # Mensagens flash pendentes mudam a página: responde 200 para exibi-las (o
+    # template as consome) e os 304 voltam na requisição seguinte
+    if '_flashes' not in session and not is_resource_modified(
+            request.environ, etag=etag, last_modified=ultima_alteracao):
+        resposta = app.response_class(status=304)
+    else:
+        resposta = make_response(gerar(versoes))
+        resposta.last_modified = ultima_alteracao
+    resposta.set_etag(etag)
+    resposta.cache_control.private = True
+    resposta.cache_control.no_cache = True
+    return resposta
+
+def paginar(query, coluna, cursor_arg):
+    """Paginação por cursor (keyset): busca os itens com `coluna` maior que o
+    cursor recebido em `request.args[cursor_arg]`.
+
+    Retorna a página e o cursor da próxima (ou None se for a última)."""
+    por_pagina = app.config['ITENS_POR_PAGINA']
+    depois = request.args.get(cursor_arg, type=int)
+    if depois is not None:
+        query = query.filter(coluna > depois)
+    itens = query.order_by(coluna).limit(por_pagina + 1).all()
+    if len(itens) > por_pagina:
+        return itens[:por_pagina], getattr(itens[por_pagina - 1], coluna.key)
+    return itens, None
+
+@app.template_global()
+def url_pagina(**cursores):
+    """URL da página atual trocando apenas os cursores informados."""
+    args = request.args.to_dict()
+    args.update(request.view_args or {})
+    args.update(cursores)
+    return url_for(request.endpoint, **args)
+
+# Importação/exportação em massa (flask importar / flask exportar)
+MODELOS_EM_MASSA = {
+    'usuarios': Usuario,
+    'cavaleiros': Cavaleiro,
+    'quests': Quest,
+    'conquistas': Conquista,
+}
+
+def converter_valor(coluna, valor):
+    """Converte um valor lido de CSV/JSON para o tipo da coluna."""
+    if valor is None or valor == '':
+        return None
+    tipo = coluna.type.python_type
+    if tipo is bool:
+        return valor if isinstance(valor, bool) else str(valor).lower() in ('1', 'true', 't', 'sim', 'on')
+    if tipo is datetime:
+        return valor if isinstance(valor, datetime) else datetime.fromisoformat(valor)
+    if tipo is int:
+        return int(valor)
+    if tipo is str:
+        return str(valor)
+    if isinstance(valor, str):
+        # Date e demais tipos com fromisoformat
+        return tipo.fromisoformat(valor)
+    return valor
+
+def valor_padrao(coluna):
+    padrao = coluna.default
+    if padrao is None:
+        return None
+    return padrao.arg(None) if padrao.is_callable else padrao.arg
+
+def ler_linhas(arquivo, formato):
+    """Gera um dict por linha, sem carregar o arquivo inteiro."""
+    if formato == 'csv':
+        yield from csv.DictReader(arquivo)
+    else:
+        for linha in arquivo:
+            if linha.strip():
+                yield json.loads(linha)
+
+def inserir_ignorando_existentes(tabela):
+    """INSERT que pula as linhas que violariam uma chave única (id, username,
+    nome), como o mestre criado na inicialização de todo banco novo."""
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(tabela).on_conflict_do_nothing()
+    if db.engine.dialect.name == 'sqlite':
+        return sqlite.insert(tabela).on_conflict_do_nothing()
+    return tabela.insert()
+
+def importar_linhas(modelo, linhas, lote=1000, commit=10000, hash_senhas=None):
+    """Insere as linhas em lotes de `lote` (executemany) com commit a cada
+    `commit` linhas. Colunas ausentes recebem o padrão do modelo; o id só é
+    usado se vier no arquivo; linhas que já existem são ignoradas. Senhas em
+    texto (campo password) são hasheadas por lote no pool de `hash_senhas`.
+    Retorna o total lido."""
+    tabela = modelo.__table__
+    colunas = [c for c in tabela.columns if c.name != 'id']
+    inserir = inserir_ignorando_existentes(tabela)
+    hash_senhas = hash_senhas or hasheador
+    pendentes = []
+    senhas = []
+    total = desde_commit = 0
+
+    def gravar():
+        nonlocal pendentes, senhas, desde_commit
+        if senhas:
+            for (linha, _), hash_senha in zip(senhas, hash_senhas.gerar_varios([s for _, s in senhas])):
+                linha['password_hash'] = hash_senha
+            senhas = []
+        if pendentes:
+            db.session.execute(inserir, pendentes)
+            desde_commit += len(pendentes)
+            pendentes = []
+        if desde_commit >= commit:
+            db.session.commit()
+            desde_commit = 0
+
+    for bruta in linhas:
+        linha = {c.name: converter_valor(c, bruta[c.name]) if c.name in bruta else valor_padrao(c)
+                 for c in colunas}
+        if modelo is Usuario and bruta.get('password') and not linha['password_hash']:
+            senhas.append((linha, bruta['password']))
+        if modelo is Quest and linha['concluida'] and not linha['proximo_reset']:
+            linha['proximo_reset'] = Quest(diaria=linha['diaria'], semanal=linha['semanal']) \
+                .calcular_proximo_reset(datetime.utcnow())
+        if modelo is Cavaleiro and bruta.get('experiencia_total') in (None, ''):
+            # Arquivos anteriores ao experiencia_total: níveis completos + XP atual
+            nivel, experiencia = linha['nivel'] or 1, linha['experiencia'] or 0
+            linha['experiencia_total'] = 50 * nivel * (nivel - 1) + experiencia
+        if bruta.get('id') not in (None, ''):
+            linha['id'] = int(bruta['id'])
+        # executemany exige as mesmas chaves em todas as linhas do lote
+        if pendentes and ('id' in linha) != ('id' in pendentes[0]):
+            gravar()
+        pendentes.append(linha)
+        total += 1
+        if len(pendentes) >= lote:
+            gravar()
+    gravar()
+    db.session.commit()
+    return total
+
+def ajustar_sequencia(modelo):
+    """No Postgres, ids importados não avançam a sequência; ajusta para o maior id."""
+    if db.engine.dialect.name == 'postgresql':
+        tabela = modelo.__table__.name
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {tabela}), 1))"))
+        db.session.commit()
+
+def exportar_linhas(modelo, lote=1000):
+    """Gera as linhas da tabela com cursor no servidor (stream_results),
+    buscando `lote` por vez."""
+    tabela = modelo.__table__
+    resultado = db.session.execute(
+        db.select(tabela).order_by(tabela.c.id).execution_options(stream_results=True))
+    for linhas in resultado.mappings().partitions(lote):
+        yield from linhas
+
+def serializar(valor):
+    return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+def formato_do_arquivo(caminho, formato):
+    return formato or ('csv' if caminho.endswith('.csv') else 'jsonl')
+
+@app.cli.command('importar')
+@click.argument('modelo', type=click.Choice(list(MODELOS_EM_MASSA)))
+@click.argument('caminho', type=click.Path(exists=True, dir_okay=False))
+@click.option('--formato', type=click.Choice(['jsonl', 'csv']), help='Padrão: pela extensão do arquivo.')
+@click.option('--lote', default=1000, show_default=True, help='Linhas por INSERT (executemany).')
+@click.option('--commit', 'tamanho_commit', default=10000, show_default=True, help='Linhas por commit.')
+def importar_comando(modelo, caminho, formato, lote, tamanho_commit):
+    """Importa usuarios, cavaleiros, quests ou conquistas de JSONL/CSV."""
+    modelo = MODELOS_EM_MASSA[modelo]
+    contar = lambda: db.session.query(db.func.count()).select_from(modelo).scalar()
+    antes = contar()
+    # Fora dos workers do servidor: o hash das senhas pode usar todos os núcleos
+    hash_senhas = Hasheador(app.config['SENHA_METODO'], os.cpu_count() or 1)
+    inicio = time.perf_counter()
+    try:
+        with open(caminho, newline='', encoding='utf-8') as arquivo:
+            total = importar_linhas(modelo, ler_linhas(arquivo, formato_do_arquivo(caminho, formato)),
+                                    lote=lote, commit=tamanho_commit, hash_senhas=hash_senhas)
+    except IntegrityError as erro:
+        # Só em bancos sem ON CONFLICT; os lotes já confirmados permanecem
+        db.session.rollback()
+        raise click.ClickException(f'Linha em conflito com o banco: {erro.orig}')
+    finally:
+        hash_senhas.encerrar()
+    inseridas = contar() - antes
+    ajustar_sequencia(modelo)
+    invalidar_cache(*GRUPOS_CACHE)
+    db.session.commit()
+    if modelo in (Cavaleiro, Conquista):
+        reconstruir_ranking()
+    segundos = max(time.perf_counter() - inicio, 1e-6)
+    print(f'{inseridas} linhas importadas em {segundos:.1f}s ({total / segundos:.0f} linhas/s)'
+          + (f', {total - inseridas} já existentes ignoradas' if total > inseridas else ''))
+
+@app.cli.command('exportar')
+@click.argument('modelo', type=click.Choice(list(MODELOS_EM_MASSA)))
+@click.argument('caminho', type=click.Path(dir_okay=False, writable=True))
+@click.option('--formato', type=click.Choice(['jsonl', 'csv']), help='Padrão: pela extensão do arquivo.')
+@click.option('--lote', default=1000, show_default=True, help='Linhas buscadas por vez.')
+def exportar_comando(modelo, caminho, formato, lote):
+    """Exporta usuarios, cavaleiros, quests ou conquistas para JSONL/CSV."""
+    modelo = MODELOS_EM_MASSA[modelo]
+    colunas = [c.name for c in modelo.__table__.columns]
+    total = 0
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        if formato_do_arquivo(caminho, formato) == 'csv':
+            escritor = csv.DictWriter(arquivo, fieldnames=colunas)
+            escritor.writeheader()
+            escrever = lambda linha: escritor.writerow(linha)
+        else:
+            escrever = lambda linha: arquivo.write(json.dumps(linha, ensure_ascii=False) + '\n')
+        for linha in exportar_linhas(modelo, lote):
+            escrever({c: serializar(linha[c]) for c in colunas})
+            total += 1
+    print(f'{total} linhas exportadas para {caminho}')
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
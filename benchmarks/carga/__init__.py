@@ -0,0 +1,19 @@
+"""Suíte de carga reprodutível: gera uma guilda sintética e dirige o app real.
+
+Uso (a partir da raiz do repositório):
+
+    python -m benchmarks.carga mista --usuarios 1000 --threads 8 --duracao 30 --saida base.json
+    DATABASE_URL=postgresql://... python -m benchmarks.carga mista --gunicorn 4
+    python -m benchmarks.carga reset --usuarios 50000 --lote 1000
+    python -m benchmarks.carga concorrencia_xp --threads 16 --toggles 200
+    python -m benchmarks.carga consultas --pequeno 5 --usuarios 100
+    python -m benchmarks.carga ranking --usuarios 100000
+    python -m benchmarks.carga importacao --linhas 200000 --formato csv
+    python -m benchmarks.carga login --threads 16
+
+Todos os cenários populam a base com gerar_guilda (opções --usuarios,
+--diarias, --semanais, --globais, --conquistas, --concluidas,
+--experiencia-maxima e --semente) e escrevem um único relatório JSON com
+cenário, revisão, banco, parâmetros e as medidas, para comparar execuções
+entre mudanças no app.py. Sem DATABASE_URL, usam um SQLite temporário.
+"""
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.carga import __doc__ as DOC
+from benchmarks.carga.cenarios import CENARIOS
+
+parser = argparse.ArgumentParser(description=DOC.splitlines()[0])
+subparsers = parser.add_subparsers(dest='cenario', required=True)
+for nome, modulo in CENARIOS.items():
+    subparser = subparsers.add_parser(nome, help=modulo.__doc__.splitlines()[0],
+                                      description=modulo.__doc__)
+    modulo.configurar(subparser)
+    subparser.add_argument('--saida', help='arquivo JSON de saída (padrão: stdout)')
+
+argv = sys.argv[1:]
+# Sem cenário explícito, roda a carga mista (compatível com a linha de comando antiga)
+if argv and argv[0].startswith('-') and argv[0] not in ('-h', '--help'):
+    argv.insert(0, 'mista')
+args = parser.parse_args(argv)
+cenario = CENARIOS[args.cenario]
+
+# O app lê a configuração do ambiente ao ser importado
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "carga.db")}'
+# Os cenários cronometram o reset à parte; o agendador não deve interferir
+os.environ.setdefault('RESET_INTERVALO_MINUTOS', '100000')
+if hasattr(cenario, 'ambiente'):
+    os.environ.update(cenario.ambiente(args))
+
+import app as app_mod  # noqa: E402
+
+app_mod.scheduler.shutdown(wait=False)
+
+try:
+    resultado = cenario.executar(app_mod, args)
+finally:
+    app_mod.hasheador.encerrar()
+
+with app_mod.app.app_context():
+    banco = app_mod.db.engine.dialect.name
+
+try:
+    revisao = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+except OSError:
+    revisao = None
+
+relatorio = {
+    'cenario': args.cenario,
+    'revisao': revisao or None,
+    'banco': banco,
+    'parametros': {k: v for k, v in vars(args).items() if k not in ('cenario', 'saida')},
+    **resultado,
+}
+
+saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+if args.saida:
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(saida + '\n')
+else:
+    print(saida)
+sys.exit(0 if relatorio.get('ok', True) else 1)
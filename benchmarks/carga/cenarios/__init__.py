@@ -0,0 +1,21 @@
+"""Cenários da suíte de carga.
+
+Cada módulo expõe `configurar(parser)` (opções da guilda via adicionar_opcoes,
+mais as do cenário), opcionalmente `ambiente(args)` (variáveis lidas pelo app
+ao ser importado) e `executar(app_mod, args)`, que gera a guilda com
+gerar_guilda e devolve o resultado como dict; `'ok': False` faz a execução
+sair com código 1. Os módulos não importam o app: o __main__ ajusta o
+ambiente antes.
+"""
+from benchmarks.carga.cenarios import (concorrencia_xp, consultas, importacao, login, mista,
+                                       ranking, reset)
+
+CENARIOS = {
+    'mista': mista,
+    'reset': reset,
+    'concorrencia_xp': concorrencia_xp,
+    'consultas': consultas,
+    'ranking': ranking,
+    'importacao': importacao,
+    'login': login,
+}
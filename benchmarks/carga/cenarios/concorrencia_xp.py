@@ -0,0 +1,97 @@
+"""Estresse do XP sob toggles concorrentes.
+
+Várias threads alternam as quests de um mesmo cavaleiro da guilda pelo test
+client; no fim o XP ganho precisa bater com o livro-razão e com as quests que
+ficaram concluídas.
+"""
+import random
+import threading
+import time
+
+from benchmarks.carga.dados import adicionar_opcoes, gerar_guilda_das_opcoes, resumo
+
+
+def configurar(parser):
+    # Um cavaleiro alvo com 20 quests; o resto da guilda só dá volume às tabelas
+    adicionar_opcoes(parser, usuarios=100, diarias=20, semanais=0, globais=0, conquistas=0)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--toggles', type=int, default=200, help='toggles por thread')
+    parser.add_argument('--lote', type=int, default=5, help='quests por chamada a /concluir_quests')
+
+
+def executar(app_mod, args):
+    app, db = app_mod.app, app_mod.db
+    Cavaleiro, Quest, RegistroExperiencia = app_mod.Cavaleiro, app_mod.Quest, app_mod.RegistroExperiencia
+
+    def contas(cavaleiro_id):
+        cavaleiro = db.session.get(Cavaleiro, cavaleiro_id)
+        razao = db.session.query(db.func.sum(RegistroExperiencia.quantidade)).filter_by(
+            cavaleiro_id=cavaleiro_id).scalar() or 0
+        concluidas = db.session.query(db.func.sum(Quest.experiencia_recompensa)).filter(
+            Quest.cavaleiro_id == cavaleiro_id, Quest.concluida == True).scalar() or 0
+        return cavaleiro, razao, concluidas
+
+    with app.app_context():
+        guilda = gerar_guilda_das_opcoes(app_mod, args)
+        cavaleiro_id = guilda['cavaleiro_ids'][0]
+        usuario_id = db.session.get(Cavaleiro, cavaleiro_id).usuario_id
+        # O alvo parte sem quests concluídas: todo XP ganho daqui em diante tem lançamento
+        Quest.query.filter_by(cavaleiro_id=cavaleiro_id).update(
+            {'concluida': False, 'proximo_reset': None}, synchronize_session=False)
+        db.session.commit()
+        quest_ids = [i for (i,) in db.session.query(Quest.id).filter_by(cavaleiro_id=cavaleiro_id)]
+        cavaleiro, razao_inicial, _ = contas(cavaleiro_id)
+        experiencia_inicial = cavaleiro.experiencia_total
+
+    erros = []
+    # Operações concluídas por thread; uma exceção na thread não pode passar por sucesso
+    feitas = [0] * args.threads
+
+    def trabalhador(numero):
+        try:
+            aleatorio = random.Random(args.semente * 1000 + numero)
+            cliente = app.test_client()
+            with cliente.session_transaction() as sessao:
+                sessao['user_id'] = usuario_id
+            for _ in range(args.toggles):
+                if aleatorio.random() < 0.2:
+                    lote = aleatorio.sample(quest_ids, min(args.lote, len(quest_ids)))
+                    resposta = cliente.post('/concluir_quests', headers={'Referer': '/'},
+                                            data={'quest_id': lote})
+                else:
+                    resposta = cliente.get(f'/toggle_quest/{aleatorio.choice(quest_ids)}',
+                                           headers={'Referer': '/'})
+                if resposta.status_code != 302:
+                    erros.append(resposta.status_code)
+                feitas[numero] += 1
+        except Exception as erro:
+            erros.append(repr(erro))
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    with app.app_context():
+        cavaleiro, razao, esperado = contas(cavaleiro_id)
+        ganho = cavaleiro.experiencia_total - experiencia_inicial
+        nivel_ok = (cavaleiro.nivel, cavaleiro.experiencia) == app_mod.nivel_para_experiencia(
+            cavaleiro.experiencia_total)
+
+    total = sum(feitas)
+    return {
+        'ok': (not erros and total == args.threads * args.toggles
+               and ganho == razao - razao_inicial == esperado and nivel_ok),
+        'dataset': resumo(guilda),
+        'duracao_segundos': round(duracao, 3),
+        'operacoes': total,
+        'ops_por_segundo': round(total / duracao, 2),
+        'erros': len(erros),
+        'primeiros_erros': [str(erro) for erro in erros[:5]],
+        'experiencia_ganha': ganho,
+        'livro_razao': razao - razao_inicial,
+        'quests_concluidas': esperado,
+    }
@@ -0,0 +1,71 @@
+"""Contagem de comandos SQL por rota; falha se a contagem crescer com o número de linhas.
+
+Mede a guilda em dois tamanhos (--pequeno cavaleiros, depois --usuarios) e
+compara a contagem de cada rota; uma diferença indica N+1 (um lazy load por
+item exibido).
+"""
+from contextlib import contextmanager
+
+from benchmarks.carga.dados import adicionar_opcoes, gerar_guilda_das_opcoes, resumo
+
+
+def configurar(parser):
+    adicionar_opcoes(parser, usuarios=100, diarias=1, semanais=1, globais=100)
+    parser.add_argument('--pequeno', type=int, default=5, help='cavaleiros na primeira medição')
+
+
+def ambiente(args):
+    # Página maior que a base grande, para que todos os itens sejam renderizados
+    return {'ITENS_POR_PAGINA': str(2 * (args.usuarios + args.globais))}
+
+
+@contextmanager
+def contar_queries(app_mod):
+    from sqlalchemy import event
+
+    comandos = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        comandos.append(statement)
+
+    event.listen(app_mod.db.engine, 'before_cursor_execute', registrar)
+    try:
+        yield comandos
+    finally:
+        event.remove(app_mod.db.engine, 'before_cursor_execute', registrar)
+
+
+def medir(app_mod, cavaleiro_id):
+    cliente = app_mod.app.test_client()
+    with cliente.session_transaction() as sessao:
+        mestre = app_mod.Usuario.query.filter_by(is_master=True).first()
+        sessao['user_id'] = mestre.id
+        sessao['is_master'] = True
+    contagens = {}
+    # Mede a renderização completa, não o cache de fragmentos
+    app_mod.cache_fragmentos.clear()
+    for rota in ('/', f'/cavaleiro/{cavaleiro_id}', '/conquistas', '/ranking'):
+        with contar_queries(app_mod) as comandos:
+            resposta = cliente.get(rota)
+        assert resposta.status_code == 200, (rota, resposta.status_code)
+        contagens[rota.split('/')[1] or 'tabuleiro'] = len(comandos)
+    return contagens
+
+
+def executar(app_mod, args):
+    globais_pequeno = args.globais * args.pequeno // args.usuarios
+    with app_mod.app.app_context():
+        guilda = gerar_guilda_das_opcoes(app_mod, args, usuarios=args.pequeno, globais=globais_pequeno)
+        pequeno = medir(app_mod, guilda['cavaleiro_ids'][-1])
+        # Outra semente acrescenta o restante da guilda
+        guilda = gerar_guilda_das_opcoes(app_mod, args, usuarios=args.usuarios - args.pequeno,
+                                         globais=args.globais - globais_pequeno, semente=args.semente + 1)
+        grande = medir(app_mod, guilda['cavaleiro_ids'][-1])
+
+    cresceram = [rota for rota in pequeno if grande[rota] > pequeno[rota]]
+    return {
+        'ok': not cresceram,
+        'dataset': resumo(guilda),
+        'queries': {rota: {'pequeno': pequeno[rota], 'grande': grande[rota]} for rota in pequeno},
+        'cresceram': cresceram,
+    }
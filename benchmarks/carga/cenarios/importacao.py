@@ -0,0 +1,73 @@
+"""Importação/exportação em massa de quests (linhas por segundo).
+
+Gera um arquivo JSONL (ou CSV) de quests para os cavaleiros da guilda,
+importa com importar_linhas e exporta de volta, medindo a vazão e o pico de
+memória do processo (RSS), que deve ficar constante com o tamanho do arquivo.
+"""
+import csv
+import json
+import os
+import random
+import resource
+import tempfile
+
+from benchmarks.carga.dados import adicionar_opcoes, gerar_guilda_das_opcoes, resumo
+from benchmarks.carga.medicao import cronometrar
+
+
+def configurar(parser):
+    adicionar_opcoes(parser, usuarios=100, diarias=0, semanais=0, globais=0, conquistas=0)
+    parser.add_argument('--linhas', type=int, default=200_000, help='quests no arquivo')
+    parser.add_argument('--formato', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--lote', type=int, default=1000)
+    parser.add_argument('--commit', type=int, default=10000)
+
+
+def escrever_arquivo(caminho, formato, linhas, cavaleiro_ids, semente):
+    aleatorio = random.Random(semente)
+    campos = ['titulo', 'descricao', 'diaria', 'semanal', 'categoria', 'cavaleiro_id', 'experiencia_recompensa']
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=campos) if formato == 'csv' else None
+        if escritor:
+            escritor.writeheader()
+        for i in range(linhas):
+            linha = {'titulo': f'Quest {i}', 'descricao': 'Importada', 'diaria': i % 3 == 0,
+                     'semanal': i % 3 == 1, 'categoria': 'dia',
+                     'cavaleiro_id': aleatorio.choice(cavaleiro_ids), 'experiencia_recompensa': 10}
+            if escritor:
+                escritor.writerow(linha)
+            else:
+                arquivo.write(json.dumps(linha) + '\n')
+
+
+def medida(segundos_ms, total):
+    return {'linhas': total, 'ms': segundos_ms,
+            'linhas_por_segundo': round(total / (segundos_ms / 1000), 2) if segundos_ms else None,
+            # ru_maxrss vem em KiB no Linux
+            'pico_rss_mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+def executar(app_mod, args):
+    pasta = tempfile.mkdtemp()
+    entrada = os.path.join(pasta, f'quests.{args.formato}')
+
+    def importar():
+        with open(entrada, newline='', encoding='utf-8') as arquivo:
+            return app_mod.importar_linhas(app_mod.Quest, app_mod.ler_linhas(arquivo, args.formato),
+                                           lote=args.lote, commit=args.commit)
+
+    def exportar():
+        total = 0
+        with open(os.path.join(pasta, 'exportado.jsonl'), 'w', encoding='utf-8') as arquivo:
+            for linha in app_mod.exportar_linhas(app_mod.Quest, args.lote):
+                arquivo.write(json.dumps({c: app_mod.serializar(v) for c, v in linha.items()}) + '\n')
+                total += 1
+        return total
+
+    with app_mod.app.app_context():
+        guilda = gerar_guilda_das_opcoes(app_mod, args)
+        escrever_arquivo(entrada, args.formato, args.linhas, guilda['cavaleiro_ids'], args.semente)
+        importacao = medida(*cronometrar(importar))
+        exportacao = medida(*cronometrar(exportar))
+
+    return {'dataset': resumo(guilda), 'importacao': importacao, 'exportacao': exportacao}
@@ -0,0 +1,63 @@
+"""Latência do /login com usuários concorrentes.
+
+Compare o hash na thread da requisição com o pool de processos:
+
+    SENHA_PROCESSOS=0 python -m benchmarks.carga login --threads 16
+    SENHA_PROCESSOS=4 python -m benchmarks.carga login --threads 16
+
+Respostas 503 (fila de hashes cheia) são contadas à parte.
+"""
+import threading
+import time
+
+from benchmarks.carga.dados import SENHA, adicionar_opcoes, gerar_guilda_das_opcoes, resumo
+from benchmarks.carga.medicao import percentis
+
+
+def configurar(parser):
+    adicionar_opcoes(parser, usuarios=50, diarias=0, semanais=0, globais=0, conquistas=0)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=10, help='logins por thread')
+
+
+def executar(app_mod, args):
+    app = app_mod.app
+    with app.app_context():
+        # A guilda usa um único hash para todos: o custo medido é o da verificação
+        guilda = gerar_guilda_das_opcoes(app_mod, args)
+    usernames = guilda['usernames']
+
+    latencias = []
+    status = {}
+    trava = threading.Lock()
+
+    def trabalhador(numero):
+        cliente = app.test_client()
+        for i in range(args.logins):
+            username = usernames[(numero * args.logins + i) % len(usernames)]
+            inicio = time.perf_counter()
+            resposta = cliente.post('/login', data={'username': username, 'password': SENHA})
+            duracao = time.perf_counter() - inicio
+            with trava:
+                status[str(resposta.status_code)] = status.get(str(resposta.status_code), 0) + 1
+                if resposta.status_code == 302:
+                    latencias.append(duracao)
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'dataset': resumo(guilda),
+        'senha_metodo': app.config['SENHA_METODO'],
+        'senha_processos': app.config['SENHA_PROCESSOS'],
+        'duracao_segundos': round(duracao, 3),
+        'logins': len(latencias),
+        'logins_por_segundo': round(len(latencias) / duracao, 2),
+        'status': status,
+        **percentis(latencias),
+    }
@@ -0,0 +1,147 @@
+"""Carga mista: tabuleiro, perfis, toggles, criação de quests e logins, mais um resetar_quests cronometrado.
+
+Dirige o app pelo test client ou por um gunicorn local (--gunicorn N).
+"""
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.carga.clientes import ClienteHTTP, ClienteTeste
+from benchmarks.carga.dados import SENHA, adicionar_opcoes, gerar_guilda_das_opcoes, resumo
+from benchmarks.carga.medicao import percentis
+
+# Peso de cada operação na mistura
+OPERACOES = {
+    'tabuleiro': 40,
+    'perfil': 25,
+    'toggle_quest': 20,
+    'adicionar_quest': 10,
+    'login': 5,
+}
+
+
+def configurar(parser):
+    adicionar_opcoes(parser)
+    parser.add_argument('--threads', type=int, default=8, help='usuários virtuais simultâneos')
+    parser.add_argument('--duracao', type=float, default=20, help='segundos de carga')
+    parser.add_argument('--gunicorn', type=int, default=0, metavar='WORKERS',
+                        help='sobe um gunicorn local com N workers em vez do test client')
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def subir_gunicorn(workers):
+    porta = porta_livre()
+    raiz = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{porta}', 'app:app'],
+        cwd=raiz, env=os.environ.copy(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', porta), timeout=0.1).close()
+            return processo, f'http://127.0.0.1:{porta}'
+        except OSError:
+            time.sleep(0.1)
+    processo.terminate()
+    raise SystemExit('gunicorn não subiu')
+
+
+def usuario_virtual(numero, args, novo_cliente, guilda, quest_ids, fim, resultados, trava):
+    aleatorio = random.Random(args.semente * 1000 + numero)
+    cliente = novo_cliente()
+    username = guilda['usernames'][numero % len(guilda['usernames'])]
+    cavaleiro_id = guilda['cavaleiro_ids'][numero % len(guilda['cavaleiro_ids'])]
+    cliente.post('/login', {'username': username, 'password': SENHA})
+    nomes, pesos = zip(*OPERACOES.items())
+    locais = {nome: ([], {}) for nome in nomes}
+
+    while time.perf_counter() < fim:
+        operacao = aleatorio.choices(nomes, pesos)[0]
+        inicio = time.perf_counter()
+        if operacao == 'tabuleiro':
+            status = cliente.get('/')
+        elif operacao == 'perfil':
+            status = cliente.get(f'/cavaleiro/{aleatorio.choice(guilda["cavaleiro_ids"])}')
+        elif operacao == 'toggle_quest':
+            status = cliente.get(f'/toggle_quest/{aleatorio.choice(quest_ids)}', {'Referer': '/'})
+        elif operacao == 'adicionar_quest':
+            status = cliente.post('/adicionar_quest', {
+                'titulo': 'Quest da carga', 'descricao': '', 'categoria': 'dia', 'diaria': 'on',
+                'cavaleiro_id': cavaleiro_id, 'experiencia_recompensa': 10})
+        else:
+            status = cliente.post('/login', {'username': username, 'password': SENHA})
+        latencias, status_contagem = locais[operacao]
+        latencias.append(time.perf_counter() - inicio)
+        status_contagem[status] = status_contagem.get(status, 0) + 1
+
+    with trava:
+        for nome, (latencias, status_contagem) in locais.items():
+            resultados[nome][0].extend(latencias)
+            for status, n in status_contagem.items():
+                resultados[nome][1][str(status)] = resultados[nome][1].get(str(status), 0) + n
+
+
+def executar(app_mod, args):
+    app = app_mod.app
+    with app.app_context():
+        guilda = gerar_guilda_das_opcoes(app_mod, args)
+        quest_ids = [i for (i,) in app_mod.db.session.query(app_mod.Quest.id)
+                     .filter(app_mod.Quest.cavaleiro_id.in_(guilda['cavaleiro_ids'][:1000]))
+                     .limit(10000)]
+
+    servidor = None
+    if args.gunicorn:
+        servidor, base = subir_gunicorn(args.gunicorn)
+        novo_cliente = lambda: ClienteHTTP(base)
+    else:
+        novo_cliente = lambda: ClienteTeste(app)
+
+    resultados = {nome: ([], {}) for nome in OPERACOES}
+    trava = threading.Lock()
+    try:
+        inicio = time.perf_counter()
+        fim = inicio + args.duracao
+        threads = [threading.Thread(target=usuario_virtual,
+                                    args=(i, args, novo_cliente, guilda, quest_ids, fim, resultados, trava))
+                   for i in range(args.threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duracao = time.perf_counter() - inicio
+    finally:
+        if servidor:
+            servidor.terminate()
+            servidor.wait()
+
+    # Depois da carga: reset cronometrado, com as quests concluídas vencidas
+    with app.app_context():
+        app_mod.Quest.query.filter(app_mod.Quest.proximo_reset != None).update(
+            {'proximo_reset': app_mod.datetime.utcnow()}, synchronize_session=False)
+        app_mod.db.session.commit()
+        inicio_reset = time.perf_counter()
+        resetadas = app_mod.resetar_quests()
+        segundos_reset = time.perf_counter() - inicio_reset
+
+    todas = [l for latencias, _ in resultados.values() for l in latencias]
+    return {
+        'driver': f'gunicorn ({args.gunicorn} workers)' if args.gunicorn else 'test client',
+        'dataset': resumo(guilda),
+        'duracao_segundos': round(duracao, 3),
+        'total': {'operacoes': len(todas), 'ops_por_segundo': round(len(todas) / duracao, 2),
+                  **percentis(todas)},
+        'operacoes': {
+            nome: {'operacoes': len(latencias), 'ops_por_segundo': round(len(latencias) / duracao, 2),
+                   'status': status, **percentis(latencias)}
+            for nome, (latencias, status) in resultados.items()
+        },
+        'resetar_quests': {'quests': resetadas, 'segundos': round(segundos_reset, 4)},
+    }
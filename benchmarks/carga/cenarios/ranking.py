@@ -0,0 +1,98 @@
+"""Ranking: tabela de resumo x consulta agregada ingênua.
+
+Mede top-K, a página /ranking (com o lugar do usuário logado, com e sem XP) e
+a atualização incremental, inclusive o caso com muitos empates: a primeira
+quest de um cavaleiro numa guilda em que quase todos ainda estão com 0 XP.
+"""
+import random
+
+from benchmarks.carga.dados import adicionar_opcoes, gerar_guilda_das_opcoes, resumo
+from benchmarks.carga.medicao import cronometrar, mediana_ms
+
+
+def configurar(parser):
+    adicionar_opcoes(parser, usuarios=100_000, diarias=3, semanais=2, globais=0, conquistas=0.3,
+                     concluidas=0.5, experiencia_maxima=50_000)
+    parser.add_argument('--top', type=int, default=50)
+    parser.add_argument('--repeticoes', type=int, default=20)
+
+
+def executar(app_mod, args):
+    db = app_mod.db
+    Cavaleiro, Conquista, Quest = app_mod.Cavaleiro, app_mod.Conquista, app_mod.Quest
+    E = app_mod.EstatisticaCavaleiro
+    atualizar_ranking = app_mod.atualizar_ranking
+    aleatorio = random.Random(args.semente)
+
+    def agregado_ingenuo():
+        quests = (db.session.query(Quest.cavaleiro_id, db.func.count(Quest.id).label('n'))
+                  .filter(Quest.concluida == True).group_by(Quest.cavaleiro_id).subquery())
+        conquistas = (db.session.query(Conquista.cavaleiro_id, db.func.count(Conquista.id).label('n'))
+                      .group_by(Conquista.cavaleiro_id).subquery())
+        return (db.session.query(Cavaleiro.id, Cavaleiro.nome, Cavaleiro.experiencia_total,
+                                 quests.c.n, conquistas.c.n,
+                                 db.func.rank().over(order_by=Cavaleiro.experiencia_total.desc()))
+                .outerjoin(quests, quests.c.cavaleiro_id == Cavaleiro.id)
+                .outerjoin(conquistas, conquistas.c.cavaleiro_id == Cavaleiro.id)
+                .order_by(Cavaleiro.experiencia_total.desc()))
+
+    def ingenuo_top():
+        agregado_ingenuo().limit(args.top).all()
+
+    def ingenuo_posicao():
+        ranking = agregado_ingenuo().subquery()
+        db.session.query(ranking).filter(ranking.c.id == alvo).one()
+
+    def resumo_top():
+        (db.session.query(E, Cavaleiro.nome)
+         .join(Cavaleiro, Cavaleiro.id == E.cavaleiro_id)
+         .order_by(E.posicao, E.cavaleiro_id)
+         .limit(args.top).all())
+
+    def pagina_ranking():
+        # A rota inteira: top-K, o lugar do usuário logado (busca por usuario_id) e,
+        # para quem está sem XP, a posição derivada do empate em 0
+        resposta = cliente.get('/ranking')
+        assert resposta.status_code == 200, resposta.status_code
+
+    def incremental():
+        cavaleiro_id = aleatorio.choice(ids)
+        total = db.session.query(E.experiencia_total).filter_by(cavaleiro_id=cavaleiro_id).scalar()
+        atualizar_ranking(cavaleiro_id, total + 10, quests=1)
+        db.session.commit()
+
+    def primeira_conclusao():
+        # Cada repetição tira um cavaleiro diferente do empate em 0 XP
+        atualizar_ranking(sem_experiencia.pop(), 10, quests=1)
+        db.session.commit()
+
+    with app_mod.app.app_context():
+        guilda = gerar_guilda_das_opcoes(app_mod, args)
+        ids = guilda['cavaleiro_ids']
+        alvo = aleatorio.choice(ids)
+        cliente = app_mod.app.test_client()
+        with cliente.session_transaction() as sessao:
+            sessao['user_id'] = db.session.get(Cavaleiro, alvo).usuario_id
+        reconstrucao_ms, _ = cronometrar(app_mod.reconstruir_ranking)
+
+        medidas = {
+            'top_ingenuo_ms': mediana_ms(ingenuo_top, args.repeticoes),
+            'top_resumo_ms': mediana_ms(resumo_top, args.repeticoes),
+            'posicao_ingenua_ms': mediana_ms(ingenuo_posicao, args.repeticoes),
+            'pagina_ranking_ms': mediana_ms(pagina_ranking, args.repeticoes),
+        }
+        atualizar_ranking(alvo, 0)
+        db.session.commit()
+        medidas['pagina_ranking_sem_xp_ms'] = mediana_ms(pagina_ranking, args.repeticoes)
+        medidas['incremental_ms'] = mediana_ms(incremental, args.repeticoes)
+
+        # Guilda recém-criada: todos empatados em 0 XP
+        Cavaleiro.query.update({'experiencia_total': 0}, synchronize_session=False)
+        db.session.commit()
+        app_mod.reconstruir_ranking()
+        sem_experiencia = list(ids)
+        aleatorio.shuffle(sem_experiencia)
+        medidas['primeira_quest_com_empate_ms'] = mediana_ms(
+            primeira_conclusao, min(args.repeticoes, len(sem_experiencia)))
+
+    return {'dataset': resumo(guilda), 'reconstrucao_ms': reconstrucao_ms, 'medianas': medidas}
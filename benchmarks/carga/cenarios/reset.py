@@ -0,0 +1,45 @@
+"""Reset de quests: varredura antiga (UPDATE na tabela toda) x reset incremental por proximo_reset."""
+from benchmarks.carga.dados import adicionar_opcoes, gerar_guilda_das_opcoes, resumo
+from benchmarks.carga.medicao import cronometrar
+
+
+def configurar(parser):
+    # ~1M quests, 2% concluídas e vencidas
+    adicionar_opcoes(parser, usuarios=50_000, diarias=10, semanais=10, globais=0, conquistas=0,
+                     concluidas=0.02)
+    parser.add_argument('--lote', type=int, default=1000, help='RESET_LOTE')
+
+
+def ambiente(args):
+    return {'RESET_LOTE': str(args.lote)}
+
+
+def executar(app_mod, args):
+    db, Quest = app_mod.db, app_mod.Quest
+
+    def varredura_antiga():
+        Quest.query.filter(Quest.diaria == True, Quest.concluida == True).update({'concluida': False})
+        Quest.query.filter(Quest.semanal == True, Quest.concluida == True).update({'concluida': False})
+        db.session.commit()
+
+    with app_mod.app.app_context():
+        guilda = gerar_guilda_das_opcoes(app_mod, args)
+        concluidas = Quest.query.filter_by(concluida=True).count()
+        antiga_ms, _ = cronometrar(varredura_antiga)
+        antiga_vazia_ms, _ = cronometrar(varredura_antiga)
+
+        # Restaura o estado e mede o reset incremental
+        Quest.query.filter(Quest.proximo_reset != None).update({'concluida': True})
+        db.session.commit()
+        incremental_ms, resetadas = cronometrar(app_mod.resetar_quests)
+        incremental_vazio_ms, _ = cronometrar(app_mod.resetar_quests)
+
+    return {
+        'dataset': resumo(guilda),
+        'quests_concluidas': concluidas,
+        'varredura_antiga_ms': antiga_ms,
+        'varredura_antiga_vazia_ms': antiga_vazia_ms,
+        'reset_incremental_ms': incremental_ms,
+        'reset_incremental_quests': resetadas,
+        'reset_incremental_vazio_ms': incremental_vazio_ms,
+    }
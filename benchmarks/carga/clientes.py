@@ -0,0 +1,49 @@
+"""Clientes que falam com o app: test client do Flask ou HTTP (gunicorn local)."""
+import http.cookiejar
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+class ClienteTeste:
+    """Usa o test client do Flask, no mesmo processo."""
+
+    def __init__(self, app):
+        self.cliente = app.test_client()
+
+    def get(self, caminho, headers=None):
+        return self.cliente.get(caminho, headers=headers or {}).status_code
+
+    def post(self, caminho, dados, headers=None):
+        return self.cliente.post(caminho, data=dados, headers=headers or {}).status_code
+
+
+class _SemRedirecionar(urllib.request.HTTPRedirectHandler):
+    # Mede só a requisição pedida; o 302 é o resultado esperado de várias rotas
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ClienteHTTP:
+    """Fala HTTP com um servidor de verdade, mantendo o cookie de sessão."""
+
+    def __init__(self, base):
+        self.base = base.rstrip('/')
+        self.abridor = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _SemRedirecionar())
+
+    def _abrir(self, requisicao):
+        try:
+            with self.abridor.open(requisicao, timeout=30) as resposta:
+                resposta.read()
+                return resposta.status
+        except urllib.error.HTTPError as erro:
+            erro.read()
+            return erro.code
+
+    def get(self, caminho, headers=None):
+        return self._abrir(urllib.request.Request(self.base + caminho, headers=headers or {}))
+
+    def post(self, caminho, dados, headers=None):
+        corpo = urllib.parse.urlencode(dados, doseq=True).encode()
+        return self._abrir(urllib.request.Request(self.base + caminho, data=corpo, headers=headers or {}))
@@ -0,0 +1,121 @@
+"""Geração da guilda sintética (usuários, cavaleiros, quests e conquistas)."""
+import random
+import time
+from datetime import datetime, timedelta
+
+SENHA = 'senha'
+CATEGORIAS = ('manha', 'dia', 'vendas', 'pos_venda', 'parcerias', 'expediente')
+LOTE = 5000
+
+
+def inserir(db, tabela, linhas):
+    for inicio in range(0, len(linhas), LOTE):
+        db.session.execute(tabela.insert(), linhas[inicio:inicio + LOTE])
+
+
+def gerar_guilda(app_mod, usuarios, diarias, semanais, globais, conquistas, concluidas, semente=42,
+                 experiencia_maxima=0):
+    """Popula a base do app e devolve as contagens e o tempo gasto.
+
+    Cada usuário recebe um cavaleiro com `diarias` + `semanais` quests e XP
+    total sorteado entre 0 e `experiencia_maxima`; há `globais` quests globais
+    e, em média, `conquistas` conquistas por cavaleiro. A fração `concluidas`
+    das quests fica concluída com o reset vencido, para o resetar_quests
+    cronometrado ter trabalho. Gerar de novo com outra `semente` aumenta a base.
+    """
+    db = app_mod.db
+    aleatorio = random.Random(semente)
+    inicio = time.perf_counter()
+    agora = datetime.utcnow()
+    vencido = agora - timedelta(minutes=1)
+    # Um único hash para todos: gerar um por usuário dominaria o tempo de geração
+    hash_senha = app_mod.generate_password_hash(SENHA, app_mod.app.config['SENHA_METODO'])
+
+    prefixo = f'carga{semente}_'
+    inserir(db, app_mod.Usuario.__table__, [
+        {'username': f'{prefixo}{i}', 'password_hash': hash_senha, 'is_master': False}
+        for i in range(usuarios)])
+    usuario_ids = [i for (i,) in db.session.query(app_mod.Usuario.id)
+                   .filter(app_mod.Usuario.username.like(f'{prefixo}%'))
+                   .order_by(app_mod.Usuario.id)]
+    def cavaleiro(i, usuario_id):
+        experiencia_total = aleatorio.randrange(experiencia_maxima) if experiencia_maxima else 0
+        nivel, experiencia = app_mod.nivel_para_experiencia(experiencia_total)
+        return {'nome': f'Cavaleiro {prefixo}{i}', 'classe': aleatorio.choice(('Guerreiro', 'Mago', 'Arqueiro')),
+                'nivel': nivel, 'experiencia': experiencia, 'experiencia_total': experiencia_total,
+                'usuario_id': usuario_id}
+
+    inserir(db, app_mod.Cavaleiro.__table__, [cavaleiro(i, usuario_id) for i, usuario_id in enumerate(usuario_ids)])
+    cavaleiro_ids = [i for (i,) in db.session.query(app_mod.Cavaleiro.id)
+                     .filter(app_mod.Cavaleiro.usuario_id.in_(usuario_ids))
+                     .order_by(app_mod.Cavaleiro.id)]
+
+    def quest(cavaleiro_id, diaria=False, semanal=False, global_quest=False):
+        concluida = aleatorio.random() < concluidas
+        return {'titulo': f'Quest {aleatorio.randrange(10**6)}', 'descricao': 'Gerada pela carga',
+                'concluida': concluida, 'diaria': diaria, 'semanal': semanal,
+                'global_quest': global_quest, 'mestre_quest': global_quest,
+                'categoria': aleatorio.choice(CATEGORIAS), 'data_criacao': agora,
+                'cavaleiro_id': cavaleiro_id, 'experiencia_recompensa': aleatorio.choice((5, 10, 20)),
+                'proximo_reset': vencido if concluida and (diaria or semanal) else None}
+
+    total_quests = 0
+    for inicio_lote in range(0, len(cavaleiro_ids), 1000):
+        linhas = []
+        for cavaleiro_id in cavaleiro_ids[inicio_lote:inicio_lote + 1000]:
+            linhas += [quest(cavaleiro_id, diaria=True) for _ in range(diarias)]
+            linhas += [quest(cavaleiro_id, semanal=True) for _ in range(semanais)]
+        inserir(db, app_mod.Quest.__table__, linhas)
+        total_quests += len(linhas)
+    inserir(db, app_mod.Quest.__table__, [
+        quest(aleatorio.choice(cavaleiro_ids), diaria=True, global_quest=True) for _ in range(globais)])
+
+    linhas = [{'titulo': f'Conquista {i}', 'descricao': 'Gerada pela carga', 'data': agora,
+               'cavaleiro_id': aleatorio.choice(cavaleiro_ids),
+               'global_conquista': aleatorio.random() < 0.1}
+              for i in range(int(conquistas * len(cavaleiro_ids)))]
+    inserir(db, app_mod.Conquista.__table__, linhas)
+
+    app_mod.invalidar_cache(*app_mod.GRUPOS_CACHE)
+    db.session.commit()
+    app_mod.reconstruir_ranking()
+    return {
+        'usuarios': len(usuario_ids),
+        'cavaleiros': len(cavaleiro_ids),
+        'quests': total_quests + globais,
+        'conquistas': len(linhas),
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'usernames': [f'{prefixo}{i}' for i in range(usuarios)],
+        'cavaleiro_ids': cavaleiro_ids,
+    }
+
+
+def adicionar_opcoes(parser, **padroes):
+    """Opções da guilda comuns a todos os cenários; `padroes` troca os valores
+    padrão do cenário."""
+    opcoes = {
+        'usuarios': (int, 1000, None),
+        'diarias': (int, 5, 'quests diárias por cavaleiro'),
+        'semanais': (int, 2, 'quests semanais por cavaleiro'),
+        'globais': (int, 50, None),
+        'conquistas': (float, 1.0, 'conquistas por cavaleiro'),
+        'concluidas': (float, 0.3, 'fração das quests já concluídas'),
+        'experiencia_maxima': (int, 0, 'XP total sorteado entre 0 e este valor'),
+        'semente': (int, 42, None),
+    }
+    for nome, (tipo, padrao, ajuda) in opcoes.items():
+        parser.add_argument('--' + nome.replace('_', '-'), type=tipo, default=padroes.get(nome, padrao), help=ajuda)
+
+
+def gerar_guilda_das_opcoes(app_mod, args, **ajustes):
+    """gerar_guilda com as opções de adicionar_opcoes (e `ajustes` por cima)."""
+    opcoes = {nome: getattr(args, nome) for nome in (
+        'usuarios', 'diarias', 'semanais', 'globais', 'conquistas', 'concluidas', 'semente',
+        'experiencia_maxima')}
+    opcoes.update(ajustes)
+    return gerar_guilda(app_mod, **opcoes)
+
+
+def resumo(guilda):
+    """Contagens da guilda para o relatório, sem as listas de nomes e ids."""
+    return {k: v for k, v in guilda.items() if k not in ('usernames', 'cavaleiro_ids')}
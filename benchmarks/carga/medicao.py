@@ -0,0 +1,24 @@
+"""Cronometragem e percentis usados pelos cenários."""
+import time
+
+
+def percentis(latencias):
+    latencias = sorted(latencias)
+    if not latencias:
+        return {}
+    def p(q):
+        return round(latencias[min(len(latencias) - 1, int(len(latencias) * q))] * 1000, 2)
+    return {'p50_ms': p(0.50), 'p90_ms': p(0.90), 'p95_ms': p(0.95), 'p99_ms': p(0.99),
+            'max_ms': round(latencias[-1] * 1000, 2)}
+
+
+def cronometrar(funcao):
+    """Executa funcao() uma vez; retorna (milissegundos, resultado)."""
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return round((time.perf_counter() - inicio) * 1000, 2), resultado
+
+
+def mediana_ms(funcao, repeticoes):
+    tempos = sorted(cronometrar(funcao)[0] for _ in range(repeticoes))
+    return tempos[len(tempos) // 2]
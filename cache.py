@@ -0,0 +1,105 @@
+"""Cache de fragmentos HTML renderizados.
+
+CacheLRU fica na memória do processo; CacheSQLite é um armazenamento em
+arquivo que pode ser compartilhado entre os workers do gunicorn. CacheEmCamadas
+combina os dois (consulta primeiro a memória, depois o arquivo).
+
+A invalidação não apaga entradas: as chaves incluem a versão do grupo de
+dados (ver VersaoCache em app.py), então uma escrita que incrementa a versão
+faz as entradas antigas simplesmente deixarem de ser usadas até expirarem.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    def __init__(self, tamanho=256, ttl=300):
+        self.tamanho = tamanho
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    def get(self, chave):
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor):
+        with self._trava:
+            self._itens[chave] = (valor, time.monotonic() + self.ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+
+    def clear(self):
+        with self._trava:
+            self._itens.clear()
+
+
+class CacheSQLite:
+    """Cache em arquivo SQLite, visível para todos os processos da máquina."""
+
+    def __init__(self, caminho, ttl=300):
+        self.caminho = caminho
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conexao() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS fragmento '
+                         '(chave TEXT PRIMARY KEY, valor TEXT, expira_em REAL)')
+
+    def _conexao(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, chave):
+        linha = self._conexao().execute(
+            'SELECT valor FROM fragmento WHERE chave = ? AND expira_em >= ?',
+            (chave, time.time())).fetchone()
+        return linha[0] if linha else None
+
+    def set(self, chave, valor):
+        with self._conexao() as conn:
+            conn.execute('INSERT OR REPLACE INTO fragmento VALUES (?, ?, ?)',
+                         (chave, valor, time.time() + self.ttl))
+            # Limpeza ocasional das entradas vencidas
+            if hash(chave) % 64 == 0:
+                conn.execute('DELETE FROM fragmento WHERE expira_em < ?', (time.time(),))
+
+    def clear(self):
+        with self._conexao() as conn:
+            conn.execute('DELETE FROM fragmento')
+
+
+class CacheEmCamadas:
+    def __init__(self, *camadas):
+        self.camadas = camadas
+
+    def get(self, chave):
+        for i, camada in enumerate(self.camadas):
+            valor = camada.get(chave)
+            if valor is not None:
+                for anterior in self.camadas[:i]:
+                    anterior.set(chave, valor)
+                return valor
+        return None
+
+    def set(self, chave, valor):
+        for camada in self.camadas:
+            camada.set(chave, valor)
+
+    def clear(self):
+        for camada in self.camadas:
+            camada.clear()
@@ -0,0 +1,167 @@
+"""Métricas por rota no formato de texto do Prometheus e perfil de requisições lentas.
+
+Só é ativado com METRICAS=1: desativado, nenhum hook é registrado e o
+decorator medir_job devolve a própria função, então o custo é nulo.
+
+Os números são por processo (cada worker do gunicorn tem os seus).
+"""
+import cProfile
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+# Desde o Python 3.12 o cProfile usa sys.monitoring, que aceita um só perfil
+# ativo por processo; requisições sorteadas enquanto outra é perfilada ficam sem perfil
+_trava_perfil = threading.Lock()
+
+
+class Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.contagens = [0] * len(buckets)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.soma += valor
+        self.total += 1
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.contagens[i] += 1
+
+
+class Metricas:
+    # nome -> (ajuda, buckets)
+    SERIES = {
+        'checklist_requisicao_segundos': ('Duração das requisições por endpoint.', BUCKETS_SEGUNDOS),
+        'checklist_sql_consultas': ('Comandos SQL por requisição.', BUCKETS_CONSULTAS),
+        'checklist_sql_segundos': ('Tempo em SQL por requisição.', BUCKETS_SEGUNDOS),
+        'checklist_template_segundos': ('Tempo renderizando templates por requisição.', BUCKETS_SEGUNDOS),
+        'checklist_job_segundos': ('Duração dos jobs agendados.', BUCKETS_SEGUNDOS),
+    }
+
+    def __init__(self):
+        self.ativo = False
+        self._series = {}
+        self._trava = threading.Lock()
+
+    def init_app(self, app):
+        self.ativo = app.config.get('METRICAS', False)
+        if not self.ativo:
+            return
+        self.limiar_perfil = app.config.get('PERFIL_LIMIAR_MS', 500) / 1000
+        self.amostragem = app.config.get('PERFIL_AMOSTRAGEM', 0.0)
+        self.pasta_perfis = app.config.get('PERFIL_PASTA', 'perfis')
+
+        app.before_request(self._inicio_requisicao)
+        app.teardown_request(self._fim_requisicao)
+        before_render_template.connect(self._inicio_template, app)
+        template_rendered.connect(self._fim_template, app)
+        event.listen(Engine, 'before_cursor_execute', self._inicio_sql)
+        event.listen(Engine, 'after_cursor_execute', self._fim_sql)
+
+    def observar(self, nome, rotulos, valor):
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._trava:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = Histograma(self.SERIES[nome][1])
+            serie.observar(valor)
+
+    def medir_job(self, nome):
+        def decorator(funcao):
+            if not self.ativo:
+                return funcao
+
+            @wraps(funcao)
+            def medida(*args, **kwargs):
+                inicio = time.perf_counter()
+                try:
+                    return funcao(*args, **kwargs)
+                finally:
+                    self.observar('checklist_job_segundos', {'job': nome}, time.perf_counter() - inicio)
+            return medida
+        return decorator
+
+    def _inicio_requisicao(self):
+        g.metricas = {'inicio': time.perf_counter(), 'sql': 0, 'sql_segundos': 0.0,
+                      'template_segundos': 0.0, 'templates': [], 'perfil': None}
+        sorteada = self.amostragem and random.random() < self.amostragem
+        if sorteada and _trava_perfil.acquire(blocking=False):
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+            except BaseException:
+                _trava_perfil.release()
+                raise
+            g.metricas['perfil'] = perfil
+
+    def _fim_requisicao(self, erro=None):
+        dados = g.pop('metricas', None)
+        if dados is None:
+            return
+        duracao = time.perf_counter() - dados['inicio']
+        perfil = dados['perfil']
+        if perfil is not None:
+            perfil.disable()
+            _trava_perfil.release()
+        rotulos = {'endpoint': request.endpoint or 'desconhecido'}
+        self.observar('checklist_requisicao_segundos', rotulos, duracao)
+        self.observar('checklist_sql_consultas', rotulos, dados['sql'])
+        self.observar('checklist_sql_segundos', rotulos, dados['sql_segundos'])
+        self.observar('checklist_template_segundos', rotulos, dados['template_segundos'])
+        if perfil is not None and duracao >= self.limiar_perfil:
+            os.makedirs(self.pasta_perfis, exist_ok=True)
+            # time_ns e pid: duas requisições lentas no mesmo segundo (ou em workers
+            # diferentes) não sobrescrevem o perfil uma da outra
+            nome = f'{rotulos["endpoint"]}-{time.time_ns()}-{os.getpid()}-{duracao * 1000:.0f}ms.prof'
+            perfil.dump_stats(os.path.join(self.pasta_perfis, nome))
+
+    def _inicio_template(self, app, template, context, **extra):
+        if 'metricas' in g:
+            g.metricas['templates'].append(time.perf_counter())
+
+    def _fim_template(self, app, template, context, **extra):
+        if 'metricas' in g and g.metricas['templates']:
+            g.metricas['template_segundos'] += time.perf_counter() - g.metricas['templates'].pop()
+
+    # O início fica no contexto de execução do comando, não na conexão: um
+    # comando que falha não dispara after_cursor_execute e deixaria o valor para
+    # trás na conexão devolvida ao pool
+    def _inicio_sql(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and has_request_context() and 'metricas' in g:
+            context.metricas_inicio = time.perf_counter()
+
+    def _fim_sql(self, conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, 'metricas_inicio', None)
+        if inicio is not None and has_request_context() and 'metricas' in g:
+            g.metricas['sql'] += 1
+            g.metricas['sql_segundos'] += time.perf_counter() - inicio
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (version 0.0.4)."""
+        with self._trava:
+            series = sorted(self._series.items())
+            linhas = []
+            for nome, (ajuda, _) in self.SERIES.items():
+                linhas.append(f'# HELP {nome} {ajuda}')
+                linhas.append(f'# TYPE {nome} histogram')
+                for (serie_nome, rotulos), histograma in series:
+                    if serie_nome != nome:
+                        continue
+                    base = ','.join(f'{chave}="{valor}"' for chave, valor in rotulos)
+                    for limite, contagem in zip(histograma.buckets, histograma.contagens):
+                        linhas.append(f'{nome}_bucket{{{base},le="{limite}"}} {contagem}')
+                    linhas.append(f'{nome}_bucket{{{base},le="+Inf"}} {histograma.total}')
+                    linhas.append(f'{nome}_sum{{{base}}} {histograma.soma}')
+                    linhas.append(f'{nome}_count{{{base}}} {histograma.total}')
+        return '\n'.join(linhas) + '\n'
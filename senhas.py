@@ -0,0 +1,133 @@
+"""Hash de senhas fora da thread da requisição e limite de tentativas de login.
+
+O hash (pbkdf2/scrypt) custa dezenas a centenas de milissegundos de CPU; o
+Hasheador o executa num pool de processos limitado e recusa trabalho
+(SobrecargaHash) quando a fila enche, para a rota responder 503 logo em vez
+de prender o worker. O LimitadorTentativas barra força bruta antes de gastar
+CPU com o hash.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TempoEsgotado
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class SobrecargaHash(Exception):
+    """A fila de hashes está cheia ou o hash demorou além do limite."""
+
+
+class Hasheador:
+    def __init__(self, metodo='pbkdf2', processos=1, fila_maxima=16, timeout=10):
+        self.metodo = metodo
+        self.processos = processos
+        self.timeout = timeout
+        self._vagas = threading.BoundedSemaphore(fila_maxima)
+        self._trava = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._prefixo = None
+
+    def _executor(self):
+        # O pool é criado no primeiro uso e recriado após fork (workers do gunicorn).
+        # Os processos vêm do forkserver: fork() de um processo com threads (agendador,
+        # threads do servidor) pode deixar o filho travado num lock herdado.
+        with self._trava:
+            if self._pool is None or self._pid != os.getpid():
+                metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._pool = ProcessPoolExecutor(max_workers=self.processos,
+                                                 mp_context=multiprocessing.get_context(metodo))
+                self._pid = os.getpid()
+            return self._pool
+
+    def _executar(self, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            raise SobrecargaHash()
+        if not self.processos:
+            try:
+                return funcao(*args)
+            finally:
+                self._vagas.release()
+        try:
+            futuro = self._executor().submit(funcao, *args)
+        except BaseException:
+            self._vagas.release()
+            raise
+        # A vaga só volta quando o hash termina de fato: um hash que estourou o
+        # timeout continua ocupando o pool e não pode abrir espaço para outro
+        futuro.add_done_callback(lambda _: self._vagas.release())
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TempoEsgotado:
+            futuro.cancel()
+            raise SobrecargaHash()
+
+    def encerrar(self):
+        with self._trava:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def gerar(self, senha):
+        return self._executar(generate_password_hash, senha, self.metodo)
+
+    def verificar(self, hash_senha, senha):
+        return self._executar(check_password_hash, hash_senha, senha)
+
+    def gerar_varios(self, senhas):
+        """Hashes de várias senhas em paralelo, para importação em massa (fora
+        das requisições, então sem o limite da fila)."""
+        metodos = [self.metodo] * len(senhas)
+        if not self.processos:
+            return list(map(generate_password_hash, senhas, metodos))
+        return list(self._executor().map(generate_password_hash, senhas, metodos,
+                                         chunksize=max(1, len(senhas) // (self.processos * 4))))
+
+    def precisa_rehash(self, hash_senha):
+        """True se o hash foi gerado com parâmetros diferentes dos configurados."""
+        if self._prefixo is None:
+            # 'pbkdf2' vira 'pbkdf2:sha256:600000' etc.; o prefixo completo vem do próprio hash
+            self._prefixo = generate_password_hash('', self.metodo).split('$', 1)[0]
+        return hash_senha.split('$', 1)[0] != self._prefixo
+
+
+class LimitadorTentativas:
+    """Janela deslizante de falhas por chave (usuário ou IP), em memória do processo."""
+
+    def __init__(self, maximo, janela, chaves_maximas=10000):
+        self.maximo = maximo
+        self.janela = janela
+        self.chaves_maximas = chaves_maximas
+        self._falhas = OrderedDict()
+        self._trava = threading.Lock()
+
+    def _recentes(self, chave, agora):
+        falhas = self._falhas.get(chave)
+        if falhas is None:
+            return None
+        while falhas and falhas[0] <= agora - self.janela:
+            falhas.popleft()
+        return falhas
+
+    def bloqueado(self, chave):
+        with self._trava:
+            falhas = self._recentes(chave, time.monotonic())
+            return falhas is not None and len(falhas) >= self.maximo
+
+    def registrar_falha(self, chave):
+        with self._trava:
+            agora = time.monotonic()
+            falhas = self._recentes(chave, agora)
+            if falhas is None:
+                falhas = self._falhas[chave] = deque(maxlen=self.maximo)
+            falhas.append(agora)
+            self._falhas.move_to_end(chave)
+            while len(self._falhas) > self.chaves_maximas:
+                self._falhas.popitem(last=False)
+
+    def limpar(self, chave):
+        with self._trava:
+            self._falhas.pop(chave, None)